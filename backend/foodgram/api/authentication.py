@@ -0,0 +1,108 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from recipe.versions import bump_version, get_version
+
+TOKEN_CACHE_SIZE = getattr(settings, "TOKEN_CACHE_SIZE", 1024)
+TOKEN_CACHE_TTL = getattr(settings, "TOKEN_CACHE_TTL", 30)
+TOKEN_CACHE_SHARED = getattr(settings, "TOKEN_CACHE_SHARED", True)
+VERSION_KEY = "api:token_version"
+
+
+class TokenCache:
+    """Ограниченный LRU-кэш токенов в памяти процесса с временем жизни.
+
+    При включенном TOKEN_CACHE_SHARED промахи проверяются еще и в общем
+    кэше Django, чтобы токен не читался из базы каждым процессом отдельно.
+    Запись в памяти процесса действует, пока не изменилась версия в общем
+    кэше: сброс любого токена меняет ее, и остальные процессы перестают
+    доверять своим копиям.
+    """
+
+    def __init__(self, size, ttl, shared=False):
+        self.size = size
+        self.ttl = ttl
+        self.shared = shared
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def shared_key(key):
+        return "api:token:" + hashlib.sha256(key.encode()).hexdigest()
+
+    def version(self):
+        return get_version(VERSION_KEY)
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic() and entry[1] == version:
+                    self.entries.move_to_end(key)
+                    return entry[2]
+                del self.entries[key]
+        if self.shared:
+            value = cache.get(self.shared_key(key))
+            if value is not None:
+                self.remember(key, value, version)
+                return value
+        return None
+
+    def remember(self, key, value, version):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, version, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def set(self, key, value, version):
+        """version читается до загрузки из базы: если токен сбросили за это
+        время, запись не будет использована."""
+        self.remember(key, value, version)
+        if self.shared:
+            cache.set(self.shared_key(key), value, self.ttl)
+            if self.version() != version:
+                cache.delete(self.shared_key(key))
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        if self.shared:
+            cache.delete_many([self.shared_key(key) for key in keys])
+        bump_version(VERSION_KEY)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, TOKEN_CACHE_SHARED)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который не обращается к базе для недавно
+    проверенных токенов.
+
+    Выход и изменение пользователя сбрасывают запись в общем кэше и меняют
+    версию, поэтому копии в других процессах перестают использоваться сразу.
+    """
+
+    def authenticate_credentials(self, key):
+        version = token_cache.version()
+        cached = token_cache.get(key, version)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached, version)
+        # Каждый запрос получает свою копию, чтобы изменения request.user
+        # и закэшированные в нем связи не попадали в общий объект.
+        return copy.deepcopy(cached)
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+from recipe.models import Tag
+from recipe.versions import bump_version, get_version
+from .serializers import TagSerializer
+
+TAGS_KEY = "api:tags:2"
+# Запись сбрасывается сигналами при изменении тэгов; срок жизни ограничивает
+# устаревание, если сброс до кэша не дошел.
+TAGS_TTL = 60 * 10
+# ETag и время последнего изменения списка тэгов, без срока жизни: после
+# истечения TAGS_TTL запись собирается заново, но Last-Modified не меняется,
+# пока не изменилось содержимое.
+TAGS_MODIFIED_KEY = "api:tags_modified"
+
+
+def get_tags():
+    """Список тэгов в сериализованном виде вместе с ETag и временем сборки."""
+    entry = cache.get(TAGS_KEY)
+    if entry is None:
+        tags = TagSerializer(Tag.objects.order_by("pk"), many=True).data
+        data = [dict(tag) for tag in tags]
+        content = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        etag = quote_etag(hashlib.md5(content.encode()).hexdigest())
+        modified = cache.get(TAGS_MODIFIED_KEY)
+        if modified is None or modified[0] != etag:
+            modified = (etag, int(time.time()))
+            cache.set(TAGS_MODIFIED_KEY, modified, None)
+        entry = {
+            "data": data,
+            "ids_by_slug": {tag["slug"]: tag["id"] for tag in data},
+            "etag": etag,
+            "last_modified": modified[1],
+        }
+        cache.set(TAGS_KEY, entry, TAGS_TTL)
+    return entry
+
+
+def invalidate_tags():
+    cache.delete(TAGS_KEY)
+
+
+RECIPES_VERSION_KEY = "api:recipes_version"
+
+
+def get_recipes_version():
+    return get_version(RECIPES_VERSION_KEY)
+
+
+def bump_recipes_version():
+    bump_version(RECIPES_VERSION_KEY)
+
+
+class ResponseCache:
+    """LRU-кэш данных ответов в памяти процесса, ограниченный по объему.
+
+    Записи действительны для одной версии рецептов: при ее смене кэш
+    очищается целиком. Время жизни ограничивает устаревание счетчиков и
+    данных авторов, которые версию не меняют.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(request):
+        params = sorted(
+            (name, tuple(sorted(values)))
+            for name, values in request.query_params.lists()
+            if any(values)
+        )
+        return request.get_host(), request.path, tuple(params)
+
+    def get(self, key, version):
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.size = 0
+                self.version = version
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def set(self, key, version, data):
+        size = len(json.dumps(data, ensure_ascii=False).encode())
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if version != self.version:
+                return
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+            self.entries[key] = (time.monotonic() + self.ttl, data, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.version = None
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "bytes": self.size,
+            }
+
+
+recipe_responses = ResponseCache(
+    getattr(settings, "RESPONSE_CACHE_MAX_BYTES", 16 * 1024 * 1024),
+    getattr(settings, "RESPONSE_CACHE_TTL", 60),
+)
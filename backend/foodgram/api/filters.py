@@ -1,16 +1,58 @@
 import django_filters
+from django import forms
+from django.db.models import Case, Count, IntegerField, When
+from rest_framework.filters import BaseFilterBackend
 
-
+from recipe.fulltext import search
 from recipe.models import Recipe, User
+from .cache import get_tags
+
+RecipeTag = Recipe.tags.through
+
+
+class SlugListField(forms.Field):
+    widget = forms.SelectMultiple
+
+
+class TagsFilter(django_filters.Filter):
+    """Фильтр по слагам тэгов без JOIN и DISTINCT.
+
+    Слаги переводятся в id по закэшированному списку тэгов, рецепты
+    отбираются подзапросом IN по таблице связей. В режиме all остаются
+    рецепты, у которых есть все переданные тэги.
+    """
+
+    field_class = SlugListField
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        ids_by_slug = get_tags()["ids_by_slug"]
+        ids = {ids_by_slug[slug] for slug in value if slug in ids_by_slug}
+        mode = self.parent.form.cleaned_data.get("tags_mode") or "any"
+        if not ids or mode == "all" and len(ids) < len(set(value)):
+            return queryset.none()
+        links = RecipeTag.objects.filter(tag_id__in=ids)
+        if mode == "all" and len(ids) > 1:
+            links = (
+                links.order_by()
+                .values("recipe_id")
+                .annotate(matched=Count("tag_id"))
+                .filter(matched=len(ids))
+            )
+        return queryset.filter(pk__in=links.values("recipe_id"))
 
 
 class RecipeFilter(django_filters.FilterSet):
     author = django_filters.ModelMultipleChoiceFilter(
         field_name="author",
         queryset=User.objects.all(),
+        distinct=False,
     )
-    tags__slug = django_filters.AllValuesMultipleFilter(
-        field_name="tags__slug",
+    tags__slug = TagsFilter()
+    tags_mode = django_filters.ChoiceFilter(
+        choices=(("any", "любой из тэгов"), ("all", "все тэги")),
+        method="filter_tags_mode",
     )
     shopping_cart = django_filters.BooleanFilter(
         field_name="shopping_cart", lookup_expr="isnull"
@@ -22,6 +64,33 @@ class RecipeFilter(django_filters.FilterSet):
         fields = (
             "author",
             "tags__slug",
+            "tags_mode",
             "favorite",
             "shopping_cart",
         )
+
+    def filter_tags_mode(self, queryset, name, value):
+        # Режим читает TagsFilter, сам по себе он ничего не фильтрует.
+        return queryset
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по названию, тексту и ингредиентам рецепта.
+
+    Результаты упорядочены по релевантности.
+    """
+
+    search_param = "search"
+    max_results = 1000
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+        ids = search(query, self.max_results)
+        return queryset.filter(pk__in=ids).order_by(
+            Case(
+                *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+                output_field=IntegerField(),
+            )
+        )
@@ -0,0 +1,50 @@
+import math
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class Rollback(Exception):
+    pass
+
+
+class BenchmarkCommand(BaseCommand):
+    """Базовая команда для замеров: данные создаются внутри транзакции,
+    которая откатывается после прогона."""
+
+    repeat = 20
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=self.repeat)
+
+    def handle(self, *args, **options):
+        self.repeat = options["repeat"]
+        try:
+            with transaction.atomic():
+                self.run(**options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, **options):
+        raise NotImplementedError
+
+    def measure(self, func, repeat=None):
+        timings = []
+        for _ in range(repeat or self.repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), len(queries)
+
+    def report(self, label, ms, queries):
+        self.stdout.write(f"{label:<40} {ms:>10.3f} ms {queries:>6} queries")
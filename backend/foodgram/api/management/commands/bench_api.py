@@ -0,0 +1,386 @@
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.shopping_list import get_pdf, get_rows
+from recipe import feed
+from recipe.images import release_image
+from recipe.models import (
+    Follow,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    ShoppingListJob,
+    Tag,
+)
+from ._bench import Rollback, percentile
+
+User = get_user_model()
+
+IMAGE = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR4"
+    "2mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогон эндпоинтов api через тестовый клиент: p50/p95/p99, "
+        "число SQL-запросов и пик памяти в JSON. Все изменения данных "
+        "откатываются после прогона"
+    )
+
+    page_size = 5
+    cart_size = 10
+    subscriptions = 3
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument(
+            "--user",
+            help="email пользователя для запросов, иначе создается временный",
+        )
+        parser.add_argument("--only", nargs="+", help="имена сценариев")
+        parser.add_argument("--output", help="файл для отчета, иначе stdout")
+
+    def get_user(self, email):
+        if email:
+            user = User.objects.filter(email=email).first()
+            if user is None:
+                raise CommandError(f"Пользователь {email} не найден")
+            return user
+        # Временный пользователь с корзиной и подписками, как у живого;
+        # staff, чтобы замерить и /api/metrics.
+        user = User.objects.create(
+            email="bench-api@example.com", username="bench-api", is_staff=True
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=user, recipe=recipe)
+            for recipe in Recipe.objects.order_by("-pk")[: self.cart_size]
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author)
+            for author in User.objects.filter(recipes__isnull=False)
+            .exclude(pk=user.pk)
+            .distinct()
+            .order_by("-pk")[: self.subscriptions]
+        )
+        # bulk_create не шлет сигналов, ленту заполняем сами.
+        feed.rebuild([user.pk])
+        Recipe.objects.create(
+            author=user,
+            name="bench-api",
+            text="bench-api",
+            image="recipes/images/bench.png",
+            cooking_time=1,
+        )
+        return user
+
+    def get_scenarios(self, user):
+        # Рецепт и автор, с которыми у пользователя еще нет связей, чтобы
+        # пары добавить/удалить отвечали 201 и 204.
+        recipe = (
+            Recipe.objects.exclude(author=user)
+            .exclude(favorite__user=user)
+            .exclude(shopping_cart__user=user)
+            .order_by("pk")
+            .first()
+        )
+        own = Recipe.objects.filter(author=user).order_by("pk").first()
+        author = (
+            User.objects.exclude(pk=user.pk)
+            .exclude(following__user=user)
+            .order_by("pk")
+            .first()
+        )
+        tag = Tag.objects.order_by("pk").first()
+        ingredient = Ingredient.objects.order_by("pk").first()
+        if not (recipe and author and tag and ingredient):
+            raise CommandError("Недостаточно данных: сначала запустите generate_data")
+        pages = max(1, -(-Recipe.objects.count() // self.page_size))
+        pantry = ",".join(
+            str(pk)
+            for pk in recipe.ingredient_recipe.values_list("ingredient_id", flat=True)
+        )
+        # Готовый PDF корзины: создание задачи отвечает 201 без воркера,
+        # а статус и скачивание идут по уже выполненной задаче.
+        digest, _ = get_pdf(get_rows(user))
+        job = ShoppingListJob.objects.create(
+            user=user,
+            status=ShoppingListJob.DONE,
+            digest=digest,
+            finished=timezone.now(),
+        )
+        job_url = f"/api/recipes/shopping_cart_jobs/{job.pk}"
+        body = {
+            "author": user.pk,
+            "name": "bench",
+            "text": "bench",
+            "cooking_time": 10,
+            "image": IMAGE,
+            "tags": [tag.pk],
+            "ingredients": [{"id": ingredient.pk, "amount": 10}],
+        }
+        recipe_url = f"/api/recipes/{recipe.pk}"
+        scenarios = [
+            ("tags list", "get", "/api/tags/", None, 200),
+            ("tags detail", "get", f"/api/tags/{tag.pk}/", None, 200),
+            ("ingredients search", "get", "/api/ingredients/", {"name": "са"}, 200),
+            (
+                "ingredients detail",
+                "get",
+                f"/api/ingredients/{ingredient.pk}/",
+                None,
+                200,
+            ),
+            ("recipes list", "get", "/api/recipes/", None, 200),
+            ("recipes list limit 20", "get", "/api/recipes/", {"limit": 20}, 200),
+            (
+                "recipes deep page",
+                "get",
+                "/api/recipes/",
+                {"page": min(100, pages)},
+                200,
+            ),
+            (
+                "recipes cursor",
+                "get",
+                "/api/recipes/",
+                {"pagination": "cursor"},
+                200,
+            ),
+            (
+                "recipes search",
+                "get",
+                "/api/recipes/",
+                {"search": recipe.name.split()[-1]},
+                200,
+            ),
+            (
+                "recipes by tag",
+                "get",
+                "/api/recipes/",
+                {"tags__slug": tag.slug},
+                200,
+            ),
+            (
+                "recipes by author",
+                "get",
+                "/api/recipes/",
+                {"author": author.pk},
+                200,
+            ),
+            ("recipe detail", "get", f"{recipe_url}/", None, 200),
+            ("recipe similar", "get", f"{recipe_url}/similar/", None, 200),
+            ("recipes feed", "get", "/api/recipes/feed/", None, 200),
+            (
+                "recipes pantry",
+                "get",
+                "/api/recipes/pantry/",
+                {"ingredients": pantry},
+                200,
+            ),
+            ("recipe create", "post", "/api/recipes/", body, 201),
+            ("favorite add", "post", f"{recipe_url}/favorite/", None, 201),
+            ("favorite remove", "delete", f"{recipe_url}/favorite/", None, 204),
+            ("cart add", "post", f"{recipe_url}/shopping_cart/", None, 201),
+            ("cart remove", "delete", f"{recipe_url}/shopping_cart/", None, 204),
+            (
+                "shopping list",
+                "get",
+                "/api/recipes/download_shopping_cart/",
+                None,
+                200,
+            ),
+            (
+                "shopping list csv",
+                "get",
+                "/api/recipes/download_shopping_cart/",
+                {"format": "csv"},
+                200,
+            ),
+            (
+                "shopping list txt",
+                "get",
+                "/api/recipes/download_shopping_cart/",
+                {"format": "txt"},
+                200,
+            ),
+            (
+                "shopping list job create",
+                "post",
+                "/api/recipes/shopping_cart_jobs/",
+                None,
+                201,
+            ),
+            ("shopping list job status", "get", f"{job_url}/", None, 200),
+            (
+                "shopping list job download",
+                "get",
+                f"{job_url}/download/",
+                None,
+                200,
+            ),
+            ("users list", "get", "/api/users/", None, 200),
+            ("user detail", "get", f"/api/users/{author.pk}/", None, 200),
+            ("users me", "get", "/api/users/me/", None, 200),
+            (
+                "subscriptions",
+                "get",
+                "/api/users/subscriptions/",
+                {"recipes_limit": 3},
+                200,
+            ),
+            ("subscribe", "post", f"/api/users/{author.pk}/subscribe/", None, 201),
+            (
+                "unsubscribe",
+                "delete",
+                f"/api/users/{author.pk}/subscribe/",
+                None,
+                204,
+            ),
+        ]
+        if user.is_staff:
+            scenarios.append(("metrics", "get", "/api/metrics", None, 200))
+        if own is not None:
+            scenarios.append(
+                (
+                    "recipe update",
+                    "patch",
+                    f"/api/recipes/{own.pk}/",
+                    {key: value for key, value in body.items() if key != "image"},
+                    200,
+                )
+            )
+        return scenarios
+
+    def call(self, client, method, path, data):
+        if method == "get":
+            return client.get(path, data)
+        return getattr(client, method)(path, data, format="json")
+
+    def run_once(self, client, scenario):
+        name, method, path, data, expected = scenario
+        try:
+            response = self.call(client, method, path, data)
+            if response.streaming:
+                # Выгрузки и файлы формируются по мере чтения, поэтому ответ
+                # дочитывается в замер; тестовый клиент сам закроет его.
+                b"".join(response.streaming_content)
+            return response.status_code
+        except Exception as error:
+            return type(error).__name__
+
+    def handle(self, *args, **options):
+        # Сценарии меняют данные (создают и правят рецепты, переключают
+        # избранное и подписки), поэтому весь прогон идет в транзакции,
+        # которая откатывается.
+        images = set()
+        try:
+            with transaction.atomic():
+                last_recipe = (
+                    Recipe.objects.order_by("-pk").values_list("pk", flat=True).first()
+                )
+                report = self.run(options)
+                images.update(
+                    Recipe.objects.filter(pk__gt=last_recipe or 0).values_list(
+                        "image", flat=True
+                    )
+                )
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            # Файлы, загруженные сценарием создания, транзакция не откатывает.
+            for name in images:
+                release_image(name)
+        content = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(content)
+        else:
+            self.stdout.write(content)
+
+    def run(self, options):
+        user = self.get_user(options["user"])
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        scenarios = self.get_scenarios(user)
+        if options["only"]:
+            scenarios = [s for s in scenarios if s[0] in options["only"]]
+        timings = defaultdict(list)
+        queries = defaultdict(list)
+        statuses = defaultdict(Counter)
+        memory = {}
+        for scenario in scenarios:
+            status = self.run_once(client, scenario)
+            if status != scenario[4]:
+                raise CommandError(
+                    f"{scenario[0]}: ответ {status} вместо {scenario[4]}"
+                )
+        for scenario in scenarios:
+            tracemalloc.start()
+            self.run_once(client, scenario)
+            memory[scenario[0]] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        for _ in range(options["repeat"]):
+            for scenario in scenarios:
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    status = self.run_once(client, scenario)
+                    timings[scenario[0]].append((time.perf_counter() - start) * 1000)
+                queries[scenario[0]].append(len(captured))
+                statuses[scenario[0]][str(status)] += 1
+        unexpected = {
+            name: dict(statuses[name])
+            for name, _, _, _, expected in scenarios
+            if set(statuses[name]) != {str(expected)}
+        }
+        if unexpected:
+            raise CommandError(f"Неожиданные ответы: {unexpected}")
+        return {
+            "revision": git_revision(),
+            "database": connection.vendor,
+            "user": user.email,
+            "repeat": options["repeat"],
+            "data": {
+                "users": User.objects.count(),
+                "recipes": Recipe.objects.count(),
+                "ingredients": Ingredient.objects.count(),
+                "tags": Tag.objects.count(),
+            },
+            "endpoints": {
+                name: {
+                    "method": method.upper(),
+                    "path": path,
+                    "p50_ms": round(percentile(timings[name], 50), 3),
+                    "p95_ms": round(percentile(timings[name], 95), 3),
+                    "p99_ms": round(percentile(timings[name], 99), 3),
+                    "queries": statistics.median(queries[name]),
+                    "peak_memory_kib": round(memory[name] / 1024, 1),
+                    "statuses": dict(statuses[name]),
+                }
+                for name, method, path, data, expected in scenarios
+            },
+        }
@@ -0,0 +1,43 @@
+from django.db import connection
+from django.db.models import Q
+
+from recipe.models import Ingredient
+from recipe.search import ingredient_index
+from ._bench import BenchmarkCommand
+
+QUERIES = ("а", "мол", "сыр", "кар", "помидор", "томат", "ябл", "масло сл")
+
+
+class Command(BenchmarkCommand):
+    help = "Сравнение поиска ингредиентов через SQL и через индекс в памяти"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--limit", type=int, default=20)
+
+    def run(self, limit, **options):
+        self.stdout.write(
+            f"{Ingredient.objects.count()} ингредиентов, {connection.vendor}"
+        )
+        ingredient_index.search("прогрев", limit=limit)
+        for query in QUERIES:
+            ms, queries = self.measure(
+                lambda: list(
+                    Ingredient.objects.filter(name__istartswith=query).values(
+                        "id", "name", "measurement_unit"
+                    )
+                )
+            )
+            self.report(f"sql istartswith {query!r}", ms, queries)
+            ms, queries = self.measure(
+                lambda: list(
+                    Ingredient.objects.filter(
+                        Q(name__istartswith=query) | Q(name__icontains=query)
+                    ).values("id", "name", "measurement_unit")[:limit]
+                )
+            )
+            self.report(f"sql icontains {query!r}", ms, queries)
+            ms, queries = self.measure(
+                lambda: ingredient_index.search(query, limit=limit)
+            )
+            self.report(f"index {query!r}", ms, queries)
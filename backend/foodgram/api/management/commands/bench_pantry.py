@@ -0,0 +1,107 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, F, Q
+from rest_framework.test import APIClient
+
+from recipe.models import Ingredient, IngredientRecipe, Recipe
+from recipe.pantry import PantryIndex, pantry_index
+from ._bench import BenchmarkCommand
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = "Подбор рецептов по продуктам: GROUP BY в базе против индекса в памяти"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--recipes", type=int, default=100000)
+        parser.add_argument("--ingredients", type=int, default=2000)
+        parser.add_argument("--pantry", type=int, default=15)
+
+    def run(self, recipes, ingredients, pantry, **options):
+        rng = random.Random(0)
+        author = User.objects.create(
+            email="bench-pantry@example.com", username="bench-pantry"
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"bench-pantry-{i}", measurement_unit="г", amount=1)
+            for i in range(ingredients)
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(name__startswith="bench-pantry-").values_list(
+                "pk", flat=True
+            )
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f"bench-pantry-{i}",
+                text="bench",
+                image="recipes/images/bench.png",
+                cooking_time=1,
+            )
+            for i in range(recipes)
+        )
+        recipe_ids = list(
+            Recipe.objects.filter(author=author).values_list("pk", flat=True)
+        )
+        # Миллион строк связей быстрее вставить без создания моделей.
+        table = connection.ops.quote_name(IngredientRecipe._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} (recipe_id, ingredient_id, amount) "
+                "VALUES (%s, %s, 1)",
+                (
+                    (recipe_id, ingredient_id)
+                    for recipe_id in recipe_ids
+                    for ingredient_id in rng.sample(ingredient_ids, rng.randint(5, 15))
+                ),
+            )
+        # Продукты из частых ингредиентов, как у реального пользователя.
+        items = rng.sample(ingredient_ids[:200], pantry)
+
+        def by_sql():
+            return list(
+                Recipe.objects.annotate(
+                    matched=Count(
+                        "ingredient_recipe",
+                        filter=Q(ingredient_recipe__ingredient_id__in=items),
+                    ),
+                    total=Count("ingredient_recipe"),
+                )
+                .filter(matched__gt=0)
+                .annotate(missing=F("total") - F("matched"))
+                .order_by("missing", "-matched", "-pk")
+                .values_list("pk", "matched", "missing")[:20]
+            )
+
+        ms, queries = self.measure(by_sql, repeat=3)
+        self.report("GROUP BY over IngredientRecipe", ms, queries)
+
+        index = PantryIndex()
+        ms, queries = self.measure(index._build, repeat=1)
+        self.report(f"build index, {recipes} recipes", ms, queries)
+        index.match(items)
+        ms, queries = self.measure(lambda: index.match(items))
+        self.report("PantryIndex.match", ms, queries)
+        if [row[0] for row in index.match(items)] != [row[0] for row in by_sql()]:
+            self.stderr.write("Порядок рецептов разошелся с GROUP BY")
+
+        # Изменение одного рецепта: воркер перечитывает только его.
+        first = recipe_ids[0]
+
+        def catch_up():
+            index.invalidate([first])
+            index.match(items)
+
+        ms, queries = self.measure(catch_up)
+        self.report("match after one recipe changed", ms, queries)
+
+        client = APIClient()
+        url = "/api/recipes/pantry/?ingredients=" + ",".join(map(str, items))
+        pantry_index.match(items)
+        ms, queries = self.measure(lambda: client.get(url))
+        self.report("GET /api/recipes/pantry/", ms, queries)
@@ -0,0 +1,54 @@
+from base64 import b64encode
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from recipe.models import Recipe
+from ._bench import BenchmarkCommand
+
+User = get_user_model()
+
+
+def encode_cursor(position):
+    return b64encode(urlencode({"p": position}).encode("ascii")).decode("ascii")
+
+
+class Command(BenchmarkCommand):
+    help = "Замер выдачи рецептов на разной глубине: номер страницы и курсор"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--pages", type=int, nargs="+", default=[10, 10000])
+        parser.add_argument("--limit", type=int, default=5)
+
+    def run(self, pages, limit, **options):
+        user = User.objects.create(email="bench@foodgram.local", username="bench")
+        total = max(pages) * limit + limit
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=user,
+                name=f"recipe {i}",
+                text="bench",
+                image="recipes/images/bench.png",
+                cooking_time=1,
+            )
+            for i in range(total)
+        )
+        ids = list(
+            Recipe.objects.filter(author=user)
+            .order_by("-pk")
+            .values_list("pk", flat=True)
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        for page in pages:
+            ms, queries = self.measure(
+                lambda: client.get("/api/recipes/", {"page": page, "limit": limit})
+            )
+            self.report(f"page={page}", ms, queries)
+            cursor = encode_cursor(ids[(page - 1) * limit - 1])
+            ms, queries = self.measure(
+                lambda: client.get("/api/recipes/", {"cursor": cursor, "limit": limit})
+            )
+            self.report(f"cursor at page {page}", ms, queries)
@@ -0,0 +1,85 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from recipe.fulltext import SearchBackend, get_backend, rebuild
+from recipe.models import Ingredient, IngredientRecipe, Recipe
+from ._bench import BenchmarkCommand
+
+User = get_user_model()
+
+SYLLABLES = (
+    "ба ве ги до жу за ки ло му на пе ри со ту фа хо це чи ша бо ру ла ми ко"
+).split()
+
+
+def make_vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Command(BenchmarkCommand):
+    help = "Замер полнотекстового поиска рецептов против LIKE-запроса"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--recipes", type=int, default=100000)
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument("--vocabulary", type=int, default=20000)
+
+    def run(self, recipes, limit, vocabulary, **options):
+        rng = random.Random(0)
+        words = make_vocabulary(rng, vocabulary)
+        # Частоты слов в текстах распределены по закону Ципфа.
+        weights = [1 / rank for rank in range(1, len(words) + 1)]
+        user = User.objects.create(email="bench@foodgram.local", username="bench")
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=user,
+                name=" ".join(rng.choices(words, weights, k=3)),
+                text=" ".join(rng.choices(words, weights, k=40)),
+                image="recipes/images/bench.png",
+                cooking_time=1,
+            )
+            for _ in range(recipes)
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"{word} bench", measurement_unit="г", amount=1)
+            for word in words[:500]
+        )
+        ingredients = list(
+            Ingredient.objects.filter(name__endswith=" bench").values_list(
+                "pk", flat=True
+            )
+        )
+        ids = list(Recipe.objects.filter(author=user).values_list("pk", flat=True))
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe_id=pk, ingredient_id=ingredient, amount=1)
+            for pk in ids
+            for ingredient in rng.sample(ingredients, 5)
+        )
+        self.stdout.write(f"{len(ids)} рецептов, {connection.vendor}")
+        ms, queries = self.measure(
+            lambda: rebuild(Recipe.objects, IngredientRecipe.objects), repeat=1
+        )
+        self.report("rebuild index", ms, queries)
+        backend = get_backend()
+        fallback = SearchBackend(connection)
+        # Слова из начала словаря встречаются часто, из конца - редко.
+        samples = [
+            words[10],
+            words[1000],
+            words[10000 % len(words)],
+            f"{words[5]} {words[50]}",
+            f"{words[200]} {words[3000 % len(words)]}",
+            words[700][:3],
+        ]
+        for query in samples:
+            ms, queries = self.measure(lambda: backend.search(query, limit))
+            self.report(f"{type(backend).__name__} {query!r}", ms, queries)
+        for query in samples:
+            ms, queries = self.measure(lambda: fallback.search(query, limit), repeat=3)
+            self.report(f"LIKE {query!r}", ms, queries)
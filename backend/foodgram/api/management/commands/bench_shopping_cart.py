@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from recipe.models import Ingredient, IngredientRecipe, Recipe, ShoppingCart
+from recipe.shopping import get_shopping_list
+from ._bench import BenchmarkCommand
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = "Замер агрегации списка покупок для корзин разного размера"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 200])
+        parser.add_argument("--ingredients", type=int, default=10)
+
+    def run(self, sizes, ingredients, **options):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"bench ingredient {i}", measurement_unit="г", amount=1)
+            for i in range(ingredients * 4)
+        )
+        catalogue = list(Ingredient.objects.filter(name__startswith="bench "))
+        for size in sizes:
+            user = User.objects.create(
+                email=f"bench-{size}@foodgram.local", username=f"bench-{size}"
+            )
+            Recipe.objects.bulk_create(
+                Recipe(
+                    author=user,
+                    name=f"recipe {i}",
+                    text="bench",
+                    image="recipes/images/bench.png",
+                    cooking_time=1,
+                )
+                for i in range(size)
+            )
+            recipes = list(Recipe.objects.filter(author=user))
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(
+                    recipe=recipe,
+                    ingredient=catalogue[(i * 7 + j) % len(catalogue)],
+                    amount=j + 1,
+                )
+                for i, recipe in enumerate(recipes)
+                for j in range(ingredients)
+            )
+            ShoppingCart.objects.bulk_create(
+                ShoppingCart(user=user, recipe=recipe) for recipe in recipes
+            )
+            ms, queries = self.measure(lambda: list(get_shopping_list(user)))
+            self.report(f"cart of {size} recipes", ms, queries)
+            client = APIClient()
+            client.force_authenticate(user)
+            url = "/api/recipes/download_shopping_cart/?format=csv"
+            ms, queries = self.measure(
+                lambda: next(iter(client.get(url).streaming_content))
+            )
+            self.report(f"csv first chunk, {size} recipes", ms, queries)
+            ms, queries = self.measure(
+                lambda: b"".join(client.get(url).streaming_content)
+            )
+            self.report(f"csv export, {size} recipes", ms, queries)
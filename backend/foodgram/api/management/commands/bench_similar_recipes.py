@@ -0,0 +1,93 @@
+import random
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from recipe import similar
+from recipe.models import Ingredient, IngredientRecipe, Recipe, RecipeSignature
+from ._bench import BenchmarkCommand
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = "Замер поиска похожих рецептов по корзинам LSH и полным перебором"
+
+    repeat = 50
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument("--ingredients", type=int, default=1000)
+
+    def run(self, recipes, ingredients, **options):
+        rng = random.Random(0)
+        author = User.objects.create(
+            email="bench-similar@example.com", username="bench-similar"
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"bench-similar-{i}", measurement_unit="г", amount=1)
+            for i in range(ingredients)
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(name__startswith="bench-similar-").values_list(
+                "pk", flat=True
+            )
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f"bench-similar-{i}",
+                text="bench",
+                image="recipes/images/bench.png",
+                cooking_time=1,
+            )
+            for i in range(recipes)
+        )
+        recipe_ids = list(
+            Recipe.objects.filter(author=author).order_by("pk").values_list(
+                "pk", flat=True
+            )
+        )
+        # Рецепты строятся вариациями базовых наборов, чтобы у каждого
+        # были близкие соседи.
+        bases = [
+            rng.sample(ingredient_ids, rng.randint(6, 12))
+            for _ in range(max(1, recipes // 20))
+        ]
+        links = []
+        for recipe_id in recipe_ids:
+            items = set(rng.choice(bases))
+            for item in rng.sample(sorted(items), rng.randint(0, 2)):
+                items.discard(item)
+            items.update(rng.sample(ingredient_ids, rng.randint(0, 2)))
+            links.extend(
+                IngredientRecipe(recipe_id=recipe_id, ingredient_id=item, amount=1)
+                for item in items
+            )
+        IngredientRecipe.objects.bulk_create(links)
+
+        ms, queries = self.measure(similar.rebuild, repeat=1)
+        self.report(f"rebuild, {recipes} recipes", ms, queries)
+
+        target = recipe_ids[len(recipe_ids) // 2]
+        ms, queries = self.measure(lambda: similar.find_similar(target))
+        self.report("find_similar (LSH)", ms, queries)
+
+        def brute_force():
+            rows = list(
+                RecipeSignature.objects.values_list("recipe_id", "signature")
+            )
+            matrix = similar.unpack([row[1] for row in rows])
+            own = matrix[[row[0] for row in rows].index(target)]
+            scores = (matrix == own).mean(axis=1)
+            return np.argsort(-scores)[1:7]
+
+        ms, queries = self.measure(brute_force, repeat=5)
+        self.report("full scan of signatures", ms, queries)
+
+        client = APIClient()
+        url = f"/api/recipes/{target}/similar/"
+        ms, queries = self.measure(lambda: client.get(url))
+        self.report(f"GET {url}", ms, queries)
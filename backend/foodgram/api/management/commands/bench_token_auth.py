@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.authentication import CachedTokenAuthentication, token_cache
+from ._bench import BenchmarkCommand
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = "Сравнение проверки токена через базу и через кэш токенов"
+
+    repeat = 200
+
+    def run(self, **options):
+        user = User.objects.create(
+            email="bench-token@example.com", username="bench-token"
+        )
+        token = Token.objects.create(user=user)
+        header = f"Token {token.key}"
+        request = APIRequestFactory().get("/api/tags/", HTTP_AUTHORIZATION=header)
+
+        plain = TokenAuthentication()
+        ms, queries = self.measure(lambda: plain.authenticate(request))
+        self.report("TokenAuthentication", ms, queries)
+
+        cached = CachedTokenAuthentication()
+
+        def miss():
+            token_cache.delete(token.key)
+            cached.authenticate(request)
+
+        ms, queries = self.measure(miss)
+        self.report("CachedTokenAuthentication miss", ms, queries)
+        cached.authenticate(request)
+        ms, queries = self.measure(lambda: cached.authenticate(request))
+        self.report("CachedTokenAuthentication hit", ms, queries)
+
+        # Весь запрос к списку тэгов, который сам отдается из кэша.
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=header)
+        client.get("/api/tags/")
+
+        def cold():
+            token_cache.delete(token.key)
+            client.get("/api/tags/")
+
+        ms, queries = self.measure(cold)
+        self.report("GET /api/tags/ without token cache", ms, queries)
+        ms, queries = self.measure(lambda: client.get("/api/tags/"))
+        self.report("GET /api/tags/ with token cache", ms, queries)
+        token_cache.clear()
@@ -0,0 +1,163 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import bump_recipes_version, invalidate_tags
+from recipe import feed, fulltext, similar
+from recipe.counters import recount
+from recipe.models import (
+    Favorite,
+    Follow,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from recipe.pantry import pantry_index
+from recipe.search import ingredient_index
+
+User = get_user_model()
+
+COLORS = ("#E26C2D", "#49B64E", "#8775D2", "#F2C94C", "#2D9CDB", "#EB5757")
+
+
+def random_pairs(left, right, count, rng, exclude_equal=False):
+    pairs = set()
+    limit = len(left) * len(right)
+    attempts = 0
+    while len(pairs) < min(count, limit) and attempts < count * 10:
+        attempts += 1
+        pair = (rng.choice(left), rng.choice(right))
+        if exclude_equal and pair[0] == pair[1]:
+            continue
+        pairs.add(pair)
+    return pairs
+
+
+class Command(BaseCommand):
+    help = "Генерация тестовых данных заданного объема для замеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--tags", type=int, default=6)
+        parser.add_argument("--ingredients", type=int, default=0)
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--tags-per-recipe", type=int, default=2)
+        parser.add_argument("--favorites", type=int, default=5000)
+        parser.add_argument("--carts", type=int, default=2000)
+        parser.add_argument("--follows", type=int, default=1000)
+        parser.add_argument("--password", default="foodgram")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        prefix = f"gen{int(time.time())}"
+        start = time.perf_counter()
+        with transaction.atomic():
+            password = make_password(options["password"])
+            User.objects.bulk_create(
+                User(
+                    email=f"{prefix}-{i}@foodgram.local",
+                    username=f"{prefix}-{i}",
+                    first_name="Пользователь",
+                    last_name=str(i),
+                    password=password,
+                )
+                for i in range(options["users"])
+            )
+            users = list(
+                User.objects.filter(username__startswith=f"{prefix}-").values_list(
+                    "pk", flat=True
+                )
+            )
+            Tag.objects.bulk_create(
+                Tag(
+                    name=f"Тэг {i}",
+                    color=COLORS[i % len(COLORS)],
+                    slug=f"{prefix}-tag-{i}",
+                )
+                for i in range(options["tags"])
+            )
+            tags = list(Tag.objects.values_list("pk", flat=True))
+            Ingredient.objects.bulk_create(
+                Ingredient(
+                    name=f"{prefix} ингредиент {i}", measurement_unit="г", amount=1
+                )
+                for i in range(options["ingredients"])
+            )
+            ingredients = list(Ingredient.objects.values_list("pk", flat=True))
+            Recipe.objects.bulk_create(
+                Recipe(
+                    author_id=rng.choice(users),
+                    name=f"{prefix} рецепт {i}",
+                    text="Сгенерированный рецепт",
+                    image="recipes/images/generated.png",
+                    cooking_time=rng.randint(5, 180),
+                )
+                for i in range(options["recipes"])
+            )
+            recipes = list(
+                Recipe.objects.filter(name__startswith=f"{prefix} ").values_list(
+                    "pk", flat=True
+                )
+            )
+            if ingredients:
+                per_recipe = min(options["ingredients_per_recipe"], len(ingredients))
+                IngredientRecipe.objects.bulk_create(
+                    IngredientRecipe(
+                        recipe_id=recipe,
+                        ingredient_id=ingredient,
+                        amount=rng.randint(1, 500),
+                    )
+                    for recipe in recipes
+                    for ingredient in rng.sample(ingredients, per_recipe)
+                )
+            if tags:
+                per_recipe = min(options["tags_per_recipe"], len(tags))
+                Recipe.tags.through.objects.bulk_create(
+                    Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+                    for recipe in recipes
+                    for tag in rng.sample(tags, per_recipe)
+                )
+            for model, count in (
+                (Favorite, options["favorites"]),
+                (ShoppingCart, options["carts"]),
+            ):
+                model.objects.bulk_create(
+                    (
+                        model(user_id=user, recipe_id=recipe)
+                        for user, recipe in random_pairs(users, recipes, count, rng)
+                    ),
+                    ignore_conflicts=True,
+                )
+            Follow.objects.bulk_create(
+                (
+                    Follow(user_id=user, author_id=author)
+                    for user, author in random_pairs(
+                        users, users, options["follows"], rng, exclude_equal=True
+                    )
+                ),
+                ignore_conflicts=True,
+            )
+            recount()
+            # bulk_create не шлет сигналов, поэтому производные данные
+            # пересчитываются целиком, как командами rebuild_*.
+            fulltext.rebuild(Recipe.objects, IngredientRecipe.objects)
+            similar.rebuild()
+            feed.rebuild()
+        invalidate_tags()
+        ingredient_index.invalidate()
+        pantry_index.reset()
+        bump_recipes_version()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано {len(users)} пользователей и {len(recipes)} рецептов "
+                f"с префиксом {prefix} за {time.perf_counter() - start:.1f} с"
+            )
+        )
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.shopping_list import claim_job, cleanup, process_job
+
+CLEANUP_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер очереди PDF со списками покупок. Для параллельной обработки "
+        "можно запустить несколько экземпляров. Задачи упавших воркеров "
+        "возвращаются в очередь, старые PDF и задачи периодически удаляются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="обработать очередь и завершиться"
+        )
+        parser.add_argument("--sleep", type=float, default=1.0)
+
+    def handle(self, *args, once, sleep, **options):
+        cleaned = None
+        while True:
+            if cleaned is None or time.monotonic() - cleaned > CLEANUP_INTERVAL:
+                files, jobs = cleanup()
+                cleaned = time.monotonic()
+                if files or jobs:
+                    self.stdout.write(f"Удалено файлов: {files}, задач: {jobs}")
+            job = claim_job()
+            if job is None:
+                if once:
+                    return
+                time.sleep(sleep)
+                continue
+            job = process_job(job)
+            self.stdout.write(f"Задача {job.pk}: {job.get_status_display()}")
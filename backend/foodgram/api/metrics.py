@@ -0,0 +1,272 @@
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.core.cache import cache
+from django.db import connections
+
+PHASES = ("total", "view", "sql", "serialize", "render")
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Каждый воркер раз в PUBLISH_INTERVAL секунд кладет свои гистограммы в общий
+# кэш; снимок воркера, который давно не обновлялся, пропадает из выдачи.
+PUBLISH_INTERVAL = 10
+SNAPSHOT_TTL = 60 * 10
+WORKERS_KEY = "api:metrics:workers"
+
+local = threading.local()
+
+
+def worker_id():
+    # pid берется при каждом вызове: gunicorn с preload импортирует модуль
+    # до fork.
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def snapshot_key(worker):
+    return f"api:metrics:worker:{worker}"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def state(self):
+        return list(self.counts), self.sum, self.count
+
+    @classmethod
+    def from_state(cls, buckets, state):
+        histogram = cls(buckets)
+        histogram.counts, histogram.sum, histogram.count = state
+        return histogram
+
+    def observe(self, value):
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class Registry:
+    """Гистограммы времени и числа запросов по маршрутам.
+
+    Считаются в памяти процесса, а отдаются по всем воркерам сразу: снимки
+    остальных берутся из общего кэша, и каждая серия помечена меткой worker.
+    Так любой воркер, к которому пришел сбор метрик, отвечает полным
+    набором, и счетчики не скачут между воркерами.
+    """
+
+    def __init__(self, worker=None):
+        self.worker = worker
+        self.lock = threading.Lock()
+        self.durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.published = None
+
+    def get_worker(self):
+        return self.worker or worker_id()
+
+    def observe(self, route, timings, queries):
+        with self.lock:
+            for phase, seconds in timings.items():
+                self.durations[route, phase].observe(seconds)
+            self.queries[route].observe(queries)
+            due = (
+                self.published is None
+                or time.monotonic() - self.published >= PUBLISH_INTERVAL
+            )
+        if due:
+            self.publish()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "durations": {
+                    key: histogram.state() for key, histogram in self.durations.items()
+                },
+                "queries": {
+                    key: histogram.state() for key, histogram in self.queries.items()
+                },
+            }
+
+    def publish(self):
+        """Кладет снимок воркера в общий кэш и отмечает воркер в списке."""
+        self.published = time.monotonic()
+        worker = self.get_worker()
+        snapshot = self.snapshot()
+        cache.set(snapshot_key(worker), snapshot, SNAPSHOT_TTL)
+        # Список воркеров перезаписывается целиком; если два воркера
+        # обновили его одновременно, пропавший вернется при следующей
+        # публикации.
+        now = time.time()
+        workers = {
+            name: seen
+            for name, seen in (cache.get(WORKERS_KEY) or {}).items()
+            if now - seen < SNAPSHOT_TTL
+        }
+        workers[worker] = now
+        cache.set(WORKERS_KEY, workers, None)
+        return snapshot
+
+    def collect(self):
+        """Снимки всех живых воркеров, свой - свежий."""
+        worker = self.get_worker()
+        snapshots = {worker: self.publish()}
+        others = [name for name in cache.get(WORKERS_KEY) or {} if name != worker]
+        stored = cache.get_many([snapshot_key(name) for name in others])
+        for name in others:
+            snapshot = stored.get(snapshot_key(name))
+            if snapshot is not None:
+                snapshots[name] = snapshot
+        return snapshots
+
+    def render(self, extra=()):
+        snapshots = self.collect()
+        lines = [
+            "# HELP foodgram_request_duration_seconds "
+            "Время обработки запроса по этапам.",
+            "# TYPE foodgram_request_duration_seconds histogram",
+        ]
+        for worker, snapshot in sorted(snapshots.items()):
+            for (route, phase), state in sorted(snapshot["durations"].items()):
+                lines.extend(
+                    Histogram.from_state(DURATION_BUCKETS, state).lines(
+                        "foodgram_request_duration_seconds",
+                        f'worker="{worker}",route="{route}",phase="{phase}"',
+                    )
+                )
+        lines.extend(
+            [
+                "# HELP foodgram_request_queries SQL-запросов за запрос.",
+                "# TYPE foodgram_request_queries histogram",
+            ]
+        )
+        for worker, snapshot in sorted(snapshots.items()):
+            for route, state in sorted(snapshot["queries"].items()):
+                lines.extend(
+                    Histogram.from_state(QUERY_BUCKETS, state).lines(
+                        "foodgram_request_queries",
+                        f'worker="{worker}",route="{route}"',
+                    )
+                )
+        # Остальные показатели - только этого воркера.
+        worker = self.get_worker()
+        for name, kind, value in extra:
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f'{name}{{worker="{worker}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class RequestTimings:
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.queries = 0
+        self.active = set()
+        self.view_start = None
+
+
+def current():
+    return getattr(local, "timings", None)
+
+
+@contextmanager
+def phase(name):
+    """Засекает этап запроса; вложенные вызовы того же этапа не суммируются."""
+    timings = current()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.seconds[name] += time.perf_counter() - start
+        timings.active.discard(name)
+
+
+def sql_timer(execute, sql, params, many, context):
+    timings = current()
+    if timings is None:
+        return execute(sql, params, many, context)
+    timings.queries += 1
+    with phase("sql"):
+        return execute(sql, params, many, context)
+
+
+class TimedSerializerMixin:
+    """Время to_representation попадает в этап serialize."""
+
+    def to_representation(self, instance):
+        with phase("serialize"):
+            return super().to_representation(instance)
+
+
+class MetricsMiddleware:
+    """Этапы запроса в заголовке Server-Timing и в гистограммах registry.
+
+    SQL считается через execute_wrapper, поэтому DEBUG не нужен. Этапы
+    пересекаются: view включает sql и serialize, а запросы, выполненные
+    во время сериализации, входят и в sql, и в serialize.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = local.timings = RequestTimings()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sql_timer))
+                response = self.get_response(request)
+        finally:
+            local.timings = None
+        timings.seconds["total"] = time.perf_counter() - start
+        if "view" not in timings.seconds:
+            timings.seconds["view"] = timings.seconds["total"]
+        match = request.resolver_match
+        route = match.view_name if match else "unmatched"
+        registry.observe(
+            route, {name: timings.seconds[name] for name in PHASES}, timings.queries
+        )
+        response["Server-Timing"] = ", ".join(
+            f"{name};dur={timings.seconds[name] * 1000:.2f}" for name in PHASES
+        ) + f', db;desc="{timings.queries} queries"'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        local.timings.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timings = local.timings
+        if timings.view_start is not None:
+            timings.seconds["view"] = time.perf_counter() - timings.view_start
+        render_start = time.perf_counter()
+
+        def rendered(response):
+            timings.seconds["render"] += time.perf_counter() - render_start
+
+        response.add_post_render_callback(rendered)
+        return response
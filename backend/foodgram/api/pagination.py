@@ -1,6 +1,46 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class FoodgrampPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = "limit"
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size = 5
+    page_size_query_param = "limit"
+    ordering = "-pk"
+
+
+class RecipePagination(FoodgrampPagination):
+    """Постраничная выдача рецептов с включаемым режимом курсора.
+
+    По умолчанию работает как FoodgrampPagination. С параметром
+    pagination=cursor или cursor=... страницы выбираются по ключу
+    (WHERE pk < ...), без OFFSET и без COUNT(*). Результаты поиска идут
+    по релевантности, а не по pk, поэтому с search курсор не включается.
+    """
+
+    cursor_class = RecipeCursorPagination
+    mode_query_param = "pagination"
+    search_query_param = "search"
+
+    def use_cursor(self, request):
+        if request.query_params.get(self.search_query_param, "").strip():
+            return False
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,33 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class ExportRenderer(BaseRenderer):
+    """Формат выгрузки файла.
+
+    Файл отдает сам view, рендерер нужен, чтобы DRF принимал ?format= и
+    заголовок Accept; через него проходят только ответы с ошибками.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, dict):
+            data = "\n".join(f"{key}: {value}" for key, value in data.items())
+        return str(data).encode(self.charset)
+
+
+class PDFRenderer(ExportRenderer):
+    media_type = "application/pdf"
+    format = "pdf"
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class TextRenderer(ExportRenderer):
+    media_type = "text/plain"
+    format = "txt"
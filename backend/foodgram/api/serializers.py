@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth import authenticate
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.generics import get_object_or_404
 from drf_extra_fields.fields import Base64ImageField
@@ -10,8 +11,11 @@ from recipe.models import (
     IngredientRecipe,
     Recipe,
     Follow,
-    ShoppingCart,
+    ShoppingListJob,
 )
+from recipe.images import derivative_names
+from recipe.membership import get_membership
+from .metrics import TimedSerializerMixin
 
 User = get_user_model()
 
@@ -22,12 +26,21 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         fields = ("id", "email", "first_name", "last_name", "username", "password")
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     is_subscribed = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = User
-        fields = ("id", "email", "first_name", "last_name", "username", "is_subscribed")
+        fields = (
+            "id",
+            "email",
+            "first_name",
+            "last_name",
+            "username",
+            "is_subscribed",
+            "recipes_count",
+            "followers_count",
+        )
 
     def create(self, validated_data):
         user = User.objects.create(**validated_data)
@@ -61,41 +74,48 @@ class MyAuthTokenSerializer(serializers.Serializer):
         return attrs
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ("name", "color", "slug", "id")
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ("id", "name", "measurement_unit")
 
 
-class IngredientGetSerializer(serializers.ModelSerializer):
+class IngredientGetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source="ingredient.id")
+    name = serializers.ReadOnlyField(source="ingredient.name")
+    measurement_unit = serializers.ReadOnlyField(source="ingredient.measurement_unit")
+
     class Meta:
-        model = Ingredient
+        model = IngredientRecipe
         fields = ("id", "amount", "name", "measurement_unit")
 
 
 class IngredientCreateSerializer(serializers.ModelSerializer):
 
     id = serializers.IntegerField()
-    amount = serializers.IntegerField()
+    amount = serializers.IntegerField(min_value=1)
 
     class Meta:
         model = Ingredient
         fields = ("id", "amount")
 
 
-class RecipeGetSerializer(serializers.ModelSerializer):
-    ingredients = IngredientGetSerializer(many=True, required=False)
+class RecipeGetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    ingredients = IngredientGetSerializer(
+        source="ingredient_recipe", many=True, required=False
+    )
     author = UserSerializer(read_only=True)
     image = Base64ImageField(max_length=None)
     tags = serializers.StringRelatedField(many=True, read_only=True)
-    is_favorited = serializers.BooleanField(read_only=True)
-    is_in_shopping_cart = serializers.BooleanField(read_only=True)
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -107,10 +127,40 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             "tags",
             "cooking_time",
             "image",
+            "images",
             "is_favorited",
             "is_in_shopping_cart",
+            "favorites_count",
+            "in_carts_count",
         )
 
+    def get_membership(self):
+        membership = self.context.get("membership")
+        if membership is None:
+            request = self.context.get("request")
+            membership = get_membership(request and request.user)
+        return membership
+
+    def get_is_favorited(self, obj):
+        return obj.pk in self.get_membership().favorites
+
+    def get_is_in_shopping_cart(self, obj):
+        return obj.pk in self.get_membership().cart
+
+    def get_images(self, obj):
+        if not obj.image:
+            return None
+        request = self.context.get("request")
+        images = {}
+        for size, names in derivative_names(obj.image.name).items():
+            images[size] = {}
+            for extension, name in names.items():
+                url = obj.image.storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                images[size][extension] = url
+        return images
+
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = IngredientCreateSerializer(many=True, required=False)
@@ -136,54 +186,52 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
         return value
 
+    def validate_ingredients(self, value):
+        ids = [ingredient["id"] for ingredient in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                "Внимание, данный ингридиент уже присутствует в рецепте"
+            )
+        missing = set(ids) - set(
+            Ingredient.objects.filter(id__in=ids).values_list("id", flat=True)
+        )
+        if missing:
+            raise serializers.ValidationError(
+                f"Ингредиенты не найдены: {sorted(missing)}"
+            )
+        return value
+
+    @staticmethod
+    def create_ingredients(recipe, ingredients):
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient["id"],
+                amount=ingredient["amount"],
+            )
+            for ingredient in ingredients
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
-        ingredients = validated_data.pop("ingredients")
+        ingredients = validated_data.pop("ingredients", [])
         tags = validated_data.pop("tags")
         recipe = super().create(validated_data)
-        for tag in tags:
-            recipe.tags.add(tag)
-        for ingredient in ingredients:
-            first_ingredient = Ingredient.objects.get(id=ingredient["id"])
-            if IngredientRecipe.objects.filter(
-                ingredient=first_ingredient,
-                recipe=recipe,
-            ).exists():
-                raise serializers.ValidationError(
-                    "Внимание, данный ингридиент уже возможно присутствует в рецепте"
-                )
-            IngredientRecipe.objects.create(
-                recipe=recipe, ingredient=first_ingredient, amount=ingredient["amount"]
-            )
+        recipe.tags.set(tags)
+        self.create_ingredients(recipe, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         if "tags" in validated_data:
-            tags = validated_data.pop("tags")
-            instance.tags.clear()
-            for tag in tags:
-                instance.tags.add(tag)
+            instance.tags.set(validated_data.pop("tags"))
         if "ingredients" in validated_data:
-            ingredients = validated_data.pop("ingredients")
-            instance.ingredients.clear()
-            for ingredient in ingredients:
-                ingredient_id = ingredient["id"]
-                amount = ingredient["amount"]
-                new_ingredient = Ingredient.objects.get(id=ingredient["id"])
-                if IngredientRecipe.objects.filter(
-                    ingredient=new_ingredient,
-                    recipe=instance,
-                ).exists():
-                    raise serializers.ValidationError(
-                        "Внимание, данный ингридиент уже возможно присутствует в рецепте"
-                    )
-                IngredientRecipe.objects.create(
-                    recipe=instance, ingredient=new_ingredient, amount=amount
-                )
-                instance.ingredients.add(new_ingredient)
+            instance.ingredient_recipe.all().delete()
+            self.create_ingredients(instance, validated_data.pop("ingredients"))
         return super().update(instance, validated_data)
 
 
-class RecipeFavoriteSerializer(serializers.ModelSerializer):
+class RecipeFavoriteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     image = Base64ImageField(max_length=None)
 
     class Meta:
@@ -191,14 +239,21 @@ class RecipeFavoriteSerializer(serializers.ModelSerializer):
         fields = ("name", "image", "cooking_time")
 
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
-    ingredients = IngredientGetSerializer(
-        source="recipe.ingredients", many=True, required=False
-    )
+class RecipeSimilarSerializer(RecipeFavoriteSerializer):
+    similarity = serializers.FloatField(read_only=True)
 
     class Meta:
-        model = ShoppingCart
-        fields = ("ingredients",)
+        model = Recipe
+        fields = ("id", "name", "image", "cooking_time", "similarity")
+
+
+class RecipePantrySerializer(RecipeFavoriteSerializer):
+    matched = serializers.IntegerField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Recipe
+        fields = ("id", "name", "image", "cooking_time", "matched", "missing")
 
 
 class PasswordSerializer(serializers.ModelSerializer):
@@ -211,17 +266,9 @@ class PasswordSerializer(serializers.ModelSerializer):
         extra_kwargs = {"current_password": {"write_only": True}}
 
 
-class FollowUserSerializer(serializers.ModelSerializer):
-    recipes = RecipeFavoriteSerializer(
-        source="author.recipes", many=True, required=False
-    )
-    username = serializers.CharField(source="author.username")
-    id = serializers.CharField(source="author.id")
-    first_name = serializers.CharField(source="author.first_name")
-    last_name = serializers.CharField(source="author.last_name")
+class FollowUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    recipes = RecipeFavoriteSerializer(many=True, read_only=True)
     is_subscribed = serializers.BooleanField(read_only=True)
-    email = serializers.CharField(source="author.email")
-    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -244,3 +291,9 @@ class FollowSerializer(serializers.ModelSerializer):
     class Meta:
         model = Follow
         fields = ("user", "author")
+
+
+class ShoppingListJobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ShoppingListJob
+        fields = ("id", "status", "created", "finished", "error")
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.db.models import (
+    BooleanField,
+    Exists,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Value,
+)
+
+from recipe.models import Follow, IngredientRecipe, Recipe
+
+User = get_user_model()
+
+
+def user_flag(model, user, **lookups):
+    if not user.is_authenticated:
+        return Value(False, output_field=BooleanField())
+    return Exists(model.objects.filter(user=user, **lookups))
+
+
+def get_authors(user):
+    return User.objects.annotate(
+        is_subscribed=user_flag(Follow, user, author=OuterRef("pk"))
+    )
+
+
+def get_subscriptions(user, recipes_limit=None):
+    """Авторы, на которых подписан пользователь, с их последними рецептами.
+
+    При recipes_limit у каждого автора выбирается не более recipes_limit
+    последних рецептов коррелированным подзапросом.
+    """
+    recipes = Recipe.objects.order_by("-pk")
+    if recipes_limit is not None:
+        recipes = recipes.filter(
+            pk__in=Subquery(
+                Recipe.objects.filter(author=OuterRef("author"))
+                .order_by("-pk")
+                .values("pk")[:recipes_limit]
+            )
+        )
+    return (
+        User.objects.filter(following__user=user)
+        .annotate(is_subscribed=Value(True, output_field=BooleanField()))
+        .prefetch_related(Prefetch("recipes", queryset=recipes))
+        .order_by("pk")
+    )
+
+
+def get_recipes(user):
+    """Рецепты со всеми данными для RecipeGetSerializer: число запросов
+    не зависит от количества рецептов на странице.
+
+    Флаги избранного и списка покупок берутся из recipe.membership.
+    """
+    return (
+        Recipe.objects.prefetch_related(
+            Prefetch("author", queryset=get_authors(user)),
+            "tags",
+            Prefetch(
+                "ingredient_recipe",
+                queryset=IngredientRecipe.objects.select_related("ingredient"),
+            ),
+        )
+        .order_by("-pk")
+    )
+
+
+def get_feed(user):
+    """Рецепты из ленты подписок пользователя, новые первыми."""
+    return get_recipes(user).filter(feed_entries__user=user)
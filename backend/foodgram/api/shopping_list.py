@@ -0,0 +1,184 @@
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipe.models import ShoppingListJob
+from recipe.shopping import (
+    get_shopping_list,
+    iter_rows,
+    stream_csv,
+    stream_txt,
+)
+
+# Меняется вместе с оформлением PDF, чтобы не отдавать файлы старого вида.
+LAYOUT_VERSION = 2
+# Прежний каталог внутри MEDIA_ROOT, который раздавался без авторизации.
+LEGACY_DIR = "shopping_lists"
+FONT = "DejaVuSerif"
+LINES_PER_PAGE = 16
+# Задача, которую воркер держит дольше CLAIM_TIMEOUT, считается брошенной
+# (воркер упал) и возвращается в очередь, но не больше MAX_ATTEMPTS раз.
+CLAIM_TIMEOUT = timedelta(minutes=5)
+MAX_ATTEMPTS = 3
+# Сколько хранятся готовые PDF и завершенные задачи.
+RETENTION = timedelta(days=7)
+
+
+def get_rows(user):
+    return [
+        (item["ingredient__name"], item["ingredient__measurement_unit"], item["amount"])
+        for item in get_shopping_list(user)
+    ]
+
+
+def stream_shopping_list(user, export):
+    rows = iter_rows(get_shopping_list(user))
+    if export == "csv":
+        return stream_csv(rows)
+    return stream_txt(rows)
+
+
+def get_digest(rows):
+    content = json.dumps([LAYOUT_VERSION, rows], ensure_ascii=False)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_path(digest):
+    return os.path.join(settings.SHOPPING_LISTS_ROOT, f"{digest}.pdf")
+
+
+def render_pdf(rows):
+    if FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT, "DejaVuSerif.ttf", "UTF-8"))
+    shopping_cart = io.BytesIO()
+    p = canvas.Canvas(shopping_cart)
+    for f, (name, measurement_unit, amount) in enumerate(rows):
+        line = f % LINES_PER_PAGE
+        if f and not line:
+            p.showPage()
+        if not line:
+            p.setFont(FONT, 16)
+        p.drawString(150, 800 - line * 50, f"{name}, {measurement_unit}  {amount}")
+    p.showPage()
+    p.save()
+    return shopping_cart.getvalue()
+
+
+def reuse_pdf(path):
+    """True, если готовый файл есть; время изменения обновляется, чтобы
+    очистка не удалила файл, который только что снова понадобился."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def get_pdf(rows):
+    """Путь к PDF для списка rows; файл рендерится, только если его еще нет."""
+    digest = get_digest(rows)
+    path = get_path(digest)
+    if not reuse_pdf(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(render_pdf(rows))
+        os.replace(temporary, path)
+    return digest, path
+
+
+def requeue_stale_jobs():
+    """Возвращает в очередь задачи, брошенные упавшими воркерами.
+
+    Задачи, которые уже брали MAX_ATTEMPTS раз, завершаются с ошибкой.
+    Возвращает число возвращенных задач.
+    """
+    stale = ShoppingListJob.objects.filter(
+        status=ShoppingListJob.RUNNING, claimed__lt=timezone.now() - CLAIM_TIMEOUT
+    )
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=ShoppingListJob.FAILED,
+        error="Воркер не завершил задачу",
+        finished=timezone.now(),
+    )
+    return stale.update(status=ShoppingListJob.PENDING)
+
+
+def claim_job():
+    """Забирает самую старую задачу из очереди.
+
+    Статус меняется условным UPDATE, поэтому несколько воркеров не возьмут
+    одну задачу дважды. Время взятия нужно, чтобы вернуть задачу в очередь,
+    если воркер упадет.
+    """
+    requeue_stale_jobs()
+    for pk in ShoppingListJob.objects.filter(
+        status=ShoppingListJob.PENDING
+    ).order_by("pk").values_list("pk", flat=True)[:10]:
+        if ShoppingListJob.objects.filter(
+            pk=pk, status=ShoppingListJob.PENDING
+        ).update(
+            status=ShoppingListJob.RUNNING,
+            claimed=timezone.now(),
+            attempts=F("attempts") + 1,
+        ):
+            return ShoppingListJob.objects.select_related("user").get(pk=pk)
+    return None
+
+
+def process_job(job):
+    try:
+        job.digest, _ = get_pdf(get_rows(job.user))
+    except Exception as error:
+        job.status = ShoppingListJob.FAILED
+        job.error = repr(error)
+    else:
+        job.status = ShoppingListJob.DONE
+    job.finished = timezone.now()
+    # Если задачу за это время вернули в очередь и взял другой воркер,
+    # результат записывает он.
+    ShoppingListJob.objects.filter(pk=job.pk, claimed=job.claimed).update(
+        status=job.status, digest=job.digest, error=job.error, finished=job.finished
+    )
+    return job
+
+
+def remove_files(directory, cutoff):
+    files = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        entries = []
+    for entry in entries:
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            files += 1
+    return files
+
+
+def cleanup(retention=RETENTION):
+    """Удаляет PDF, к которым не обращались дольше retention, и старые
+    завершенные задачи. Возвращает число удаленных файлов и задач."""
+    jobs, _ = ShoppingListJob.objects.filter(
+        status__in=(ShoppingListJob.DONE, ShoppingListJob.FAILED),
+        finished__lt=timezone.now() - retention,
+    ).delete()
+    files = remove_files(
+        settings.SHOPPING_LISTS_ROOT, time.time() - retention.total_seconds()
+    )
+    # Файлы в публичном каталоге удаляются сразу, независимо от возраста.
+    files += remove_files(os.path.join(settings.MEDIA_ROOT, LEGACY_DIR), time.time())
+    return files, jobs
@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipe.models import IngredientRecipe, Recipe, Tag
+from .authentication import token_cache
+from .cache import bump_recipes_version, invalidate_tags
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def evict_tags(**kwargs):
+    transaction.on_commit(invalidate_tags)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+# Удаление IngredientRecipe не слушаем, чтобы оно оставалось одним DELETE:
+# строки удаляются при изменении или удалении рецепта, и версию меняет он.
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def evict_recipe_responses(**kwargs):
+    transaction.on_commit(bump_recipes_version)
+
+
+@receiver(post_delete, sender=Token)
+def evict_token(instance, **kwargs):
+    # После удаления Django обнуляет pk, а ключ токена и есть pk.
+    key = instance.key
+    transaction.on_commit(lambda: token_cache.delete(key))
+
+
+@receiver(post_save, sender=User)
+def evict_user_tokens(instance, created, **kwargs):
+    # Закэшированный пользователь устаревает при любом изменении,
+    # в том числе при деактивации или смене пароля.
+    if created:
+        return
+    keys = list(Token.objects.filter(user=instance).values_list("key", flat=True))
+    if keys:
+        transaction.on_commit(lambda: token_cache.delete(*keys))
@@ -1,27 +1,30 @@
-import io
+import os
 
 from django.db.models import Exists, OuterRef
-from django.http import FileResponse
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.http import http_date
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import DjangoFilterBackend
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.db.models import Count
-from rest_framework import status, viewsets, filters
+from rest_framework import status, viewsets
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import (
+    AllowAny,
+    IsAdminUser,
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
+)
 from rest_framework.generics import get_object_or_404
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
-from collections import Counter
-
 from .serializers import (
     TagSerializer,
     UserSerializer,
@@ -32,15 +35,49 @@ from .serializers import (
     MyAuthTokenSerializer,
     PasswordSerializer,
     RecipeFavoriteSerializer,
+    RecipeSimilarSerializer,
+    RecipePantrySerializer,
     FollowUserSerializer,
-    ShoppingCartSerializer,
+    ShoppingListJobSerializer,
+)
+from .filters import RecipeFilter, RecipeSearchFilter
+from .pagination import (
+    FoodgrampPagination,
+    RecipeCursorPagination,
+    RecipePagination,
+)
+from .authentication import token_cache
+from .cache import get_recipes_version, get_tags, recipe_responses
+from .metrics import registry
+from .services import get_feed, get_recipes, get_subscriptions
+from .renderers import CSVRenderer, PDFRenderer, TextRenderer
+from .shopping_list import (
+    get_digest,
+    get_path,
+    get_pdf,
+    get_rows,
+    reuse_pdf,
+    stream_shopping_list,
 )
-from .filters import RecipeFilter
-from .pagination import FoodgrampPagination
-from recipe.models import Tag, Ingredient, Recipe, Favorite, ShoppingCart, Follow
+from recipe.models import (
+    Tag,
+    Ingredient,
+    Recipe,
+    Favorite,
+    ShoppingCart,
+    Follow,
+    ShoppingListJob,
+)
+from recipe import links
+from recipe.membership import get_membership
+from recipe.pantry import pantry_index
+from recipe.search import ingredient_index
+from recipe.similar import find_similar
 
 User = get_user_model()
 
+MAX_ID = 2 ** 63 - 1
+
 
 class Logout(APIView):
     def post(self, request, format=None):
@@ -48,6 +85,25 @@ class Logout(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class Metrics(APIView):
+    """Метрики процесса в текстовом формате Prometheus, только для staff."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, format=None):
+        responses = recipe_responses.stats()
+        extra = (
+            ("foodgram_response_cache_hits_total", "counter", responses["hits"]),
+            ("foodgram_response_cache_misses_total", "counter", responses["misses"]),
+            ("foodgram_response_cache_entries", "gauge", responses["entries"]),
+            ("foodgram_response_cache_bytes", "gauge", responses["bytes"]),
+            ("foodgram_token_cache_entries", "gauge", len(token_cache.entries)),
+        )
+        return HttpResponse(
+            registry.render(extra), content_type="text/plain; version=0.0.4"
+        )
+
+
 class CustomAuthToken(ObtainAuthToken):
     def post(self, request, *args, **kwargs):
         serializer = MyAuthTokenSerializer(
@@ -66,6 +122,8 @@ class CustomAuthToken(ObtainAuthToken):
 
 class UserViewSet(viewsets.ModelViewSet):
     permission_classes = (AllowAny,)
+    lookup_value_regex = r"\d+"
+    pagination_class = FoodgrampPagination
 
     def get_queryset(self):
         queryset = User.objects.annotate(
@@ -102,28 +160,25 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     def subscribe(self, request, pk):
         author = get_object_or_404(User, pk=pk)
-        user = request.user
-        if request.method == "POST":
-            if Follow.objects.filter(user=user, author=author).exists():
-                return Response(
-                    {"errors": "Создание повторной подписки запрещено"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            if request.user != author:
-                Follow.objects.create(user=request.user, author=author)
-                data = UserSerializer(author, context={"request": request}).data
-                return Response(data, status=status.HTTP_201_CREATED)
+        if request.user == author:
             return Response({"errors": "Ошибка"}, status=status.HTTP_400_BAD_REQUEST)
+        if not links.add(Follow, user_id=request.user.pk, author_id=author.pk):
+            return Response(
+                {"errors": "Создание повторной подписки запрещено"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        author.is_subscribed = True
+        author.followers_count += 1
+        data = UserSerializer(author, context={"request": request}).data
+        return Response(data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def delete_subscribe(self, request, pk):
-        author = get_object_or_404(User, pk=pk)
-        user = request.user
-        if Follow.objects.filter(user=user, author=author).exists() is False:
+        if not links.remove(Follow, user_id=request.user.pk, author_id=pk):
+            get_object_or_404(User, pk=pk)
             return Response(
                 {"errors": "Объект не найден"}, status=status.HTTP_404_NOT_FOUND
             )
-        Follow.objects.filter(user=user, author=author).delete()
         return Response("Успешная отписка", status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -135,15 +190,18 @@ class UserViewSet(viewsets.ModelViewSet):
         url_path="subscriptions",
     )
     def subscriptions(self, request):
-        user = request.user
-        user = get_object_or_404(User, username=user.username)
-        subscriptions = Follow.objects.filter(user=request.user)
-        annotateed_subscriptions = subscriptions.annotate(
-            recipes_count=Count("author__recipes"),
-            is_subscribed=Count("author__follower"),
+        try:
+            recipes_limit = int(request.query_params["recipes_limit"])
+        except (KeyError, ValueError):
+            recipes_limit = None
+        else:
+            recipes_limit = max(recipes_limit, 0)
+        authors = get_subscriptions(request.user, recipes_limit)
+        page = self.paginate_queryset(authors)
+        serializer = FollowUserSerializer(
+            page, many=True, context={"request": request}
         )
-        data = FollowUserSerializer(annotateed_subscriptions, many=True).data
-        return Response(data, status=status.HTTP_200_OK)
+        return self.get_paginated_response(serializer.data)
 
     @action(
         detail=False,
@@ -164,30 +222,48 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
-
-    pagination_class = FoodgrampPagination
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    lookup_value_regex = r"\d+"
+    pagination_class = RecipePagination
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter)
     filterset_fields = ("author", "tags__slug", "favorite", "shopping_cart")
     filterset_class = RecipeFilter
     ordering_fields = "pk"
 
     def get_queryset(self):
-        queryset = Recipe.objects.annotate(
-            is_favorited=Exists(
-                Favorite.objects.filter(
-                    user=self.request.user, recipe__pk=OuterRef("pk")
-                )
-            ),
-            is_in_shopping_cart=Exists(
-                ShoppingCart.objects.filter(
-                    user=self.request.user, recipe__pk=OuterRef("pk")
-                )
-            ),
-        )
-        return queryset
+        return get_recipes(self.request.user)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ("list", "retrieve", "feed"):
+            context["membership"] = get_membership(self.request.user)
+        return context
+
+    def anonymous_cached(self, handler, request, *args, **kwargs):
+        """Ответы анонимным пользователям берутся из recipe_responses."""
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        version = get_recipes_version()
+        key = recipe_responses.make_key(request)
+        data = recipe_responses.get(key, version)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            recipe_responses.set(key, version, response.data)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.anonymous_cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.anonymous_cached(super().retrieve, request, *args, **kwargs)
 
     def get_serializer_class(self):
-        if self.action == "retrieve" or self.action == "list":
+        if self.action in ("retrieve", "list", "feed"):
             return RecipeGetSerializer
         return RecipeCreateSerializer
 
@@ -200,27 +276,106 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path="shopping_cart",
     )
     def shopping_cart(self, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = request.user
         if request.method == "POST":
-            if ShoppingCart.objects.filter(user=user, recipe=recipe).exists():
+            recipe = get_object_or_404(Recipe, pk=pk)
+            added = links.add(
+                ShoppingCart, user_id=request.user.pk, recipe_id=recipe.pk
+            )
+            if not added:
                 return Response(
                     {"errors": "Рецепт уже добавлен в список покупок"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            ShoppingCart.objects.create(user=request.user, recipe=recipe)
             data = RecipeFavoriteSerializer(recipe, context={"request": request}).data
             return Response(data, status=status.HTTP_201_CREATED)
-        if request.method == "DELETE":
-            if ShoppingCart.objects.filter(user=user, recipe=recipe).exists() is False:
-                return Response(
-                    {"errors": "Рецепт не найден"}, status=status.HTTP_400_BAD_REQUEST
-                )
-            ShoppingCart.objects.filter(user=user, recipe=recipe).delete()
+        if not links.remove(ShoppingCart, user_id=request.user.pk, recipe_id=pk):
+            get_object_or_404(Recipe, pk=pk)
+            return Response(
+                {"errors": "Рецепт не найден"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            "Рецепт успешно удален из списка покупок",
+            status=status.HTTP_204_NO_CONTENT,
+        )
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=[
+            IsAuthenticated,
+        ],
+        url_path="feed",
+    )
+    def feed(self, request):
+        paginator = RecipeCursorPagination()
+        page = paginator.paginate_queryset(get_feed(request.user), request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="pantry",
+    )
+    def pantry(self, request):
+        try:
+            ingredients = {
+                int(value)
+                for param in request.query_params.getlist("ingredients")
+                for value in param.split(",")
+                if value.strip()
+            }
+            # Индекс хранит id в int64, большее число туда не поместится.
+            if not all(0 < value <= MAX_ID for value in ingredients):
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"errors": "ingredients - список id ингредиентов"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not ingredients:
             return Response(
-                "Рецепт успешно удален из списка покупок",
-                status=status.HTTP_204_NO_CONTENT,
+                {"errors": "Передайте ingredients"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        found = {
+            recipe_id: (matched, missing)
+            for recipe_id, matched, missing in pantry_index.match(ingredients, limit)
+        }
+        recipes = list(Recipe.objects.filter(pk__in=found))
+        for recipe in recipes:
+            recipe.matched, recipe.missing = found[recipe.pk]
+        recipes.sort(key=lambda recipe: (recipe.missing, -recipe.matched, -recipe.pk))
+        serializer = RecipePantrySerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=True,
+        methods=["GET"],
+        url_path="similar",
+    )
+    def similar(self, request, pk):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 6)), 1), 20)
+        except ValueError:
+            limit = 6
+        scores = dict(find_similar(int(pk), limit))
+        if not scores and not Recipe.objects.filter(pk=pk).exists():
+            raise Http404
+        recipes = list(Recipe.objects.filter(pk__in=scores))
+        for recipe in recipes:
+            recipe.similarity = scores[recipe.pk]
+        recipes.sort(key=lambda recipe: (-recipe.similarity, -recipe.pk))
+        serializer = RecipeSimilarSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
 
     @action(
         detail=False,
@@ -229,28 +384,81 @@ class RecipeViewSet(viewsets.ModelViewSet):
             IsAuthenticated,
         ],
         url_path="download_shopping_cart",
+        renderer_classes=[JSONRenderer, PDFRenderer, CSVRenderer, TextRenderer],
     )
     def download_shopping_cart(self, request):
-        subscriptions = ShoppingCart.objects.filter(user=request.user)
-        data = ShoppingCartSerializer(subscriptions, many=True).data
-        shopping_cart = io.BytesIO()
-        pdfmetrics.registerFont(TTFont("DejaVuSerif", "DejaVuSerif.ttf", "UTF-8"))
-        p = canvas.Canvas(shopping_cart)
-        p.setFont("DejaVuSerif", 16)
-        count = Counter()
-        for cart in data:
-            for recipe in cart["ingredients"]:
-                count[recipe["name"], recipe["measurement_unit"]] += recipe["amount"]
-                b = dict(count)
-                keys = list(b.keys())
-                values = list(b.values())
-        for f in range(len(keys)):
-            p.drawString(150, 800 - f * 50, str(keys[f]) + "  " + str(values[f]))
-        p.showPage()
-        p.save()
-        shopping_cart.seek(0)
+        export = request.accepted_renderer.format
+        if export in ("csv", "txt"):
+            response = StreamingHttpResponse(
+                stream_shopping_list(request.user, export),
+                content_type=f"{request.accepted_renderer.media_type}; charset=utf-8",
+            )
+            response["Content-Disposition"] = (
+                f'attachment; filename="recipe_shopping_cart.{export}"'
+            )
+            return response
+        _, path = get_pdf(get_rows(request.user))
+        return FileResponse(
+            open(path, "rb"), as_attachment=True, filename="recipe_shopping_cart.pdf"
+        )
+
+    @action(
+        detail=False,
+        methods=["POST"],
+        permission_classes=[
+            IsAuthenticated,
+        ],
+        url_path="shopping_cart_jobs",
+    )
+    def create_shopping_cart_job(self, request):
+        digest = get_digest(get_rows(request.user))
+        if reuse_pdf(get_path(digest)):
+            job = ShoppingListJob.objects.create(
+                user=request.user,
+                status=ShoppingListJob.DONE,
+                digest=digest,
+                finished=timezone.now(),
+            )
+            data = ShoppingListJobSerializer(job).data
+            return Response(data, status=status.HTTP_201_CREATED)
+        job = ShoppingListJob.objects.create(user=request.user)
+        data = ShoppingListJobSerializer(job).data
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=[
+            IsAuthenticated,
+        ],
+        url_path=r"shopping_cart_jobs/(?P<job_id>\d+)",
+        url_name="shopping-cart-job",
+    )
+    def shopping_cart_job(self, request, job_id):
+        job = get_object_or_404(ShoppingListJob, pk=job_id, user=request.user)
+        return Response(ShoppingListJobSerializer(job).data)
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=[
+            IsAuthenticated,
+        ],
+        url_path=r"shopping_cart_jobs/(?P<job_id>\d+)/download",
+        url_name="shopping-cart-job-download",
+    )
+    def download_shopping_cart_job(self, request, job_id):
+        job = get_object_or_404(
+            ShoppingListJob,
+            pk=job_id,
+            user=request.user,
+            status=ShoppingListJob.DONE,
+        )
+        path = get_path(job.digest)
+        if not os.path.exists(path):
+            raise Http404
         return FileResponse(
-            shopping_cart, as_attachment=True, filename="recipe_shopping_cart.pdf"
+            open(path, "rb"), as_attachment=True, filename="recipe_shopping_cart.pdf"
         )
 
     @action(
@@ -262,24 +470,21 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path="favorite",
     )
     def favorite(self, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = request.user
         if request.method == "POST":
-            if Favorite.objects.filter(user=user, recipe=recipe).exists():
+            recipe = get_object_or_404(Recipe, pk=pk)
+            if not links.add(Favorite, user_id=request.user.pk, recipe_id=recipe.pk):
                 return Response(
                     {"errors": "Ошибка  добавления в избранное"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            Favorite.objects.create(user=user, recipe=recipe)
             data = RecipeFavoriteSerializer(recipe, context={"request": request}).data
             return Response(data, status=status.HTTP_201_CREATED)
-        if request.method == "DELETE":
-            if Favorite.objects.filter(user=user, recipe=recipe).exists() is False:
-                return Response(
-                    {"errors": "Ошибка  удаления из избранного"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-        Favorite.objects.filter(user=user, recipe=recipe).delete()
+        if not links.remove(Favorite, user_id=request.user.pk, recipe_id=pk):
+            get_object_or_404(Recipe, pk=pk)
+            return Response(
+                {"errors": "Ошибка  удаления из избранного"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         return Response("Рецепт успешно удален", status=status.HTTP_204_NO_CONTENT)
 
 
@@ -288,10 +493,46 @@ class TagViewSet(viewsets.ModelViewSet):
     http_method_names = ["get"]
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    pagination_class = None
+
+    def cached_response(self, request, data, entry):
+        not_modified = get_conditional_response(
+            request._request,
+            etag=entry["etag"],
+            last_modified=entry["last_modified"],
+        )
+        response = not_modified or Response(data)
+        response["ETag"] = entry["etag"]
+        response["Last-Modified"] = http_date(entry["last_modified"])
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        entry = get_tags()
+        return self.cached_response(request, entry["data"], entry)
+
+    def retrieve(self, request, *args, **kwargs):
+        entry = get_tags()
+        for tag in entry["data"]:
+            if str(tag["id"]) == kwargs["pk"]:
+                return self.cached_response(request, tag, entry)
+        raise Http404
 
 
 class IngredientViewSet(viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ("^name",)
+    pagination_class = None
+    search_limit = 20
+    max_search_limit = 100
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name") or request.query_params.get("search")
+        if not name:
+            return super().list(request, *args, **kwargs)
+        try:
+            limit = int(request.query_params.get("limit", self.search_limit))
+        except ValueError:
+            limit = self.search_limit
+        limit = min(max(limit, 1), self.max_search_limit)
+        return Response(ingredient_index.search(name, limit=limit))
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -110,6 +111,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# PDF со списками покупок пользователей. Каталог не должен раздаваться
+# nginx: файлы отдаются только через API владельцу списка.
+SHOPPING_LISTS_ROOT = os.path.join(BASE_DIR, "shopping_lists")
+
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
@@ -120,12 +125,33 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 5,
 }
 
+# Общий для всех процессов кэш: версии индексов в памяти воркеров, наборы
+# избранного и списка покупок, тэги. Management-команды и все воркеры
+# gunicorn должны видеть одни и те же версии, поэтому кэш в памяти
+# процесса (LocMemCache) здесь не подходит.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        "LOCATION": os.getenv("MEMCACHED_LOCATION", "127.0.0.1:11211"),
+    }
+}
+
+# Кэш проверенных токенов: размер в процессе, время жизни в секундах и
+# использование общего кэша Django как второго уровня.
+TOKEN_CACHE_SIZE = 1024
+TOKEN_CACHE_TTL = 30
+TOKEN_CACHE_SHARED = True
+
+# Кэш ответов со списком и карточками рецептов для анонимных пользователей.
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+RESPONSE_CACHE_TTL = 60
+
 # SIMPLE_JWT = {
 #    'ACCESS_TOKEN_LIFETIME': timedelta(weeks=1),
 #    'AUTH_HEADER_TYPES': ('Bearer',),
@@ -12,6 +12,7 @@ from api.views import (
     UserViewSet,
     Logout,
     CustomAuthToken,
+    Metrics,
 )
 
 
@@ -27,5 +28,6 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/auth/token/login/", CustomAuthToken.as_view()),
     path("api/auth/token/logout/", Logout.as_view(), name="logout"),
+    path("api/metrics", Metrics.as_view(), name="metrics"),
     path("api/", include(router.urls)),
 ]
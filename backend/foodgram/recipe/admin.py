@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 
 from .models import User
 from .models import (
@@ -9,21 +10,45 @@ from .models import (
     Favorite,
     ShoppingCart,
     Follow,
+    ShoppingListJob,
 )
+from .shopping import HEADER, get_shopping_lists, iter_rows, stream_csv
 
 
 class UserAdmin(admin.ModelAdmin):
-    list_display = ("username", "email")
+    list_display = ("username", "email", "recipes_count", "followers_count")
     list_filter = (
         "email",
         "username",
     )
+    actions = ("export_shopping_lists",)
+
+    def export_shopping_lists(self, request, queryset):
+        rows = iter_rows(
+            get_shopping_lists(queryset),
+            (
+                "user__email",
+                "recipe__ingredient_recipe__ingredient__name",
+                "recipe__ingredient_recipe__ingredient__measurement_unit",
+                "amount",
+            ),
+        )
+        response = StreamingHttpResponse(
+            stream_csv(rows, ("Email",) + HEADER),
+            content_type="text/csv; charset=utf-8",
+        )
+        response["Content-Disposition"] = 'attachment; filename="shopping_lists.csv"'
+        return response
+
+    export_shopping_lists.short_description = "Выгрузить списки покупок в CSV"
 
 
 class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         "name",
         "author",
+        "favorites_count",
+        "in_carts_count",
     )
     list_filter = (
         "name",
@@ -37,12 +62,10 @@ class RecipeAdmin(admin.ModelAdmin):
         "text",
         "tags",
         "cooking_time",
-        "favorite_count",
+        "favorites_count",
+        "in_carts_count",
     )
-    readonly_fields = ("favorite_count",)
-
-    def favorite_count(self, obj):
-        return Favorite.objects.count()
+    readonly_fields = ("favorites_count", "in_carts_count")
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -57,3 +80,4 @@ admin.site.register(IngredientRecipe)
 admin.site.register(Favorite)
 admin.site.register(ShoppingCart)
 admin.site.register(Follow)
+admin.site.register(ShoppingListJob)
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 
 class RecipeConfig(AppConfig):
-    name = "reсipe"
+    name = "recipe"
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Версии индексов и наборы избранного должны быть общими для воркеров."""
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if backend not in LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            "Кэш по умолчанию виден только одному процессу",
+            hint=(
+                "Сбросы индексов ингредиентов и продуктов, а также наборов "
+                "избранного и списка покупок не дойдут до других воркеров. "
+                "Настройте общий кэш (memcached, Redis или базу данных)."
+            ),
+            id="recipe.W001",
+        )
+    ]
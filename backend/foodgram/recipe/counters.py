@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Favorite, Follow, Recipe, ShoppingCart
+
+User = get_user_model()
+
+# Модель, строки которой считаются; поле связи; модель и поле счетчика.
+COUNTERS = (
+    (Favorite, "recipe", Recipe, "favorites_count"),
+    (ShoppingCart, "recipe", Recipe, "in_carts_count"),
+    (Recipe, "author", User, "recipes_count"),
+    (Follow, "author", User, "followers_count"),
+)
+
+
+def change_counter(model, field, pk, delta):
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def count_subquery(source, key):
+    return Coalesce(
+        Subquery(
+            source.objects.filter(**{key: OuterRef("pk")})
+            .order_by()
+            .values(key)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def recount():
+    """Пересчитывает все счетчики, обновляя только разошедшиеся строки."""
+    repaired = {}
+    for source, key, model, field in COUNTERS:
+        repaired[field] = model.objects.exclude(
+            **{field: count_subquery(source, key)}
+        ).update(**{field: count_subquery(source, key)})
+    return repaired
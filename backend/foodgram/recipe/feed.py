@@ -0,0 +1,103 @@
+from django.db.models import Count
+
+from .models import FeedEntry, Follow, Recipe
+
+# В ленте хранится не больше FEED_LENGTH последних рецептов; лишние
+# удаляются, когда их набирается больше FEED_SLACK, чтобы не чистить
+# ленту после каждой публикации.
+FEED_LENGTH = 500
+FEED_SLACK = 100
+BATCH_SIZE = 500
+
+
+def push(recipe_id, author_id):
+    """Добавляет рецепт в ленты всех подписчиков автора."""
+    follows = Follow.objects.filter(author_id=author_id).values_list("pk", "user_id")
+    pushed = 0
+    last = 0
+    while True:
+        rows = list(follows.filter(pk__gt=last).order_by("pk")[:BATCH_SIZE])
+        if not rows:
+            return pushed
+        last = rows[-1][0]
+        user_ids = [user_id for _, user_id in rows]
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, recipe_id=recipe_id) for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+        trim(user_ids)
+        pushed += len(user_ids)
+
+
+def trim(user_ids=None, length=FEED_LENGTH, slack=FEED_SLACK):
+    """Оставляет в лентах length последних рецептов.
+
+    Обрезаются только ленты, выросшие больше чем на slack записей.
+    """
+    entries = FeedEntry.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+    overflow = (
+        entries.order_by()
+        .values("user_id")
+        .annotate(total=Count("pk"))
+        .filter(total__gt=length + slack)
+        .values_list("user_id", flat=True)
+    )
+    removed = 0
+    for user_id in overflow:
+        cutoff = (
+            FeedEntry.objects.filter(user_id=user_id)
+            .order_by("-recipe_id")
+            .values_list("recipe_id", flat=True)[length]
+        )
+        removed += FeedEntry.objects.filter(
+            user_id=user_id, recipe_id__lte=cutoff
+        ).delete()[0]
+    return removed
+
+
+def follow(user_id, author_id, length=FEED_LENGTH):
+    """Заполняет ленту последними рецептами автора после подписки."""
+    recipe_ids = (
+        Recipe.objects.filter(author_id=author_id)
+        .order_by("-pk")
+        .values_list("pk", flat=True)[:length]
+    )
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, recipe_id=recipe_id) for recipe_id in recipe_ids],
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def unfollow(user_id, author_id):
+    return FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()[0]
+
+
+def rebuild(user_ids=None, length=FEED_LENGTH):
+    """Собирает ленты заново из подписок: для первичного заполнения и
+    восстановления после сбоев. Возвращает число записанных строк."""
+    followers = Follow.objects.values_list("user_id", flat=True).distinct()
+    if user_ids is not None:
+        followers = followers.filter(user_id__in=user_ids)
+    written = 0
+    for user_id in followers.order_by("user_id"):
+        FeedEntry.objects.filter(user_id=user_id).delete()
+        recipe_ids = (
+            Recipe.objects.filter(author__following__user_id=user_id)
+            .order_by("-pk")
+            .values_list("pk", flat=True)[:length]
+        )
+        entries = [
+            FeedEntry(user_id=user_id, recipe_id=recipe_id) for recipe_id in recipe_ids
+        ]
+        FeedEntry.objects.bulk_create(entries)
+        written += len(entries)
+    stale = FeedEntry.objects.exclude(user_id__in=Follow.objects.values("user_id"))
+    if user_ids is not None:
+        stale = stale.filter(user_id__in=user_ids)
+    stale.delete()
+    return written
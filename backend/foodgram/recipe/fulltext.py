@@ -0,0 +1,225 @@
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+WORD = re.compile(r"\w+")
+TABLE = "recipe_search"
+
+
+def get_words(query):
+    return WORD.findall(query.lower())[:16]
+
+
+def collect_documents(recipes, ingredient_recipes, ids):
+    """Документы индекса (id, название, текст, ингредиенты) для рецептов ids."""
+    ingredients = defaultdict(list)
+    for recipe_id, name in ingredient_recipes.filter(recipe_id__in=ids).values_list(
+        "recipe_id", "ingredient__name"
+    ):
+        ingredients[recipe_id].append(name)
+    return [
+        (pk, name, text, " ".join(ingredients[pk]))
+        for pk, name, text in recipes.filter(pk__in=ids).values_list(
+            "pk", "name", "text"
+        )
+    ]
+
+
+class SearchBackend:
+    """Поиск без отдельного индекса: LIKE по названию, тексту и ингредиентам.
+
+    Используется для баз, для которых нет своей реализации.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def create(self):
+        pass
+
+    def drop(self):
+        pass
+
+    def replace(self, documents):
+        pass
+
+    def delete(self, ids):
+        pass
+
+    def search(self, query, limit):
+        from .models import Recipe
+
+        condition = Q()
+        for word in get_words(query):
+            condition &= (
+                Q(name__icontains=word)
+                | Q(text__icontains=word)
+                | Q(ingredients__name__icontains=word)
+            )
+        if not condition:
+            return []
+        return list(
+            Recipe.objects.filter(condition)
+            .order_by("-pk")
+            .values_list("pk", flat=True)
+            .distinct()[:limit]
+        )
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """Индекс FTS5, ранжирование по bm25 с весами полей."""
+
+    def create(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+                "name, text, ingredients, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    def drop(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def replace(self, documents):
+        if not documents:
+            return
+        self.delete([document[0] for document in documents])
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, name, text, ingredients) "
+                "VALUES (%s, %s, %s, %s)",
+                documents,
+            )
+
+    def delete(self, ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {TABLE} WHERE rowid = %s", [(pk,) for pk in ids]
+            )
+
+    def search(self, query, limit):
+        words = get_words(query)
+        if not words:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s "
+                f"ORDER BY bm25({TABLE}, 10.0, 1.0, 5.0) LIMIT %s",
+                [" ".join(f'"{word}"*' for word in words), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    """Таблица с колонкой tsvector и GIN-индексом, ранжирование ts_rank."""
+
+    config = "russian"
+
+    def create(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+                "recipe_id integer PRIMARY KEY "
+                "REFERENCES recipe_recipe (id) ON DELETE CASCADE, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLE}_document "
+                f"ON {TABLE} USING GIN (document)"
+            )
+
+    def drop(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def replace(self, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (recipe_id, document) VALUES (%s, "
+                "setweight(to_tsvector(%s, %s), 'A') || "
+                "setweight(to_tsvector(%s, %s), 'C') || "
+                "setweight(to_tsvector(%s, %s), 'B')) "
+                "ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document",
+                [
+                    (pk, self.config, name, self.config, text, self.config, ingredients)
+                    for pk, name, text, ingredients in documents
+                ],
+            )
+
+    def delete(self, ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {TABLE} WHERE recipe_id = ANY(%s)", [list(ids)]
+            )
+
+    def search(self, query, limit):
+        words = get_words(query)
+        if not words:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT recipe_id FROM {TABLE}, to_tsquery(%s, %s) query "
+                "WHERE document @@ query "
+                "ORDER BY ts_rank(document, query) DESC LIMIT %s",
+                [self.config, " & ".join(f"{word}:*" for word in words), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgreSQLSearchBackend,
+}
+
+
+def get_backend(connection=None):
+    connection = connection or default_connection
+    path = getattr(settings, "RECIPE_SEARCH_BACKEND", None)
+    backend = import_string(path) if path else BACKENDS.get(
+        connection.vendor, SearchBackend
+    )
+    return backend(connection)
+
+
+def index_recipes(ids):
+    from .models import IngredientRecipe, Recipe
+
+    backend = get_backend()
+    documents = collect_documents(Recipe.objects, IngredientRecipe.objects, ids)
+    backend.replace(documents)
+    found = {document[0] for document in documents}
+    backend.delete([pk for pk in ids if pk not in found])
+
+
+def reindex_ingredient(ingredient_id, chunk_size=2000):
+    """Переиндексирует рецепты с ингредиентом, например после его
+    переименования. Возвращает число рецептов."""
+    from .models import IngredientRecipe
+
+    ids = list(
+        IngredientRecipe.objects.filter(ingredient_id=ingredient_id)
+        .values_list("recipe_id", flat=True)
+        .distinct()
+    )
+    for start in range(0, len(ids), chunk_size):
+        index_recipes(ids[start:start + chunk_size])
+    return len(ids)
+
+
+def rebuild(recipes, ingredient_recipes, connection=None, chunk_size=2000):
+    backend = get_backend(connection)
+    backend.drop()
+    backend.create()
+    ids = list(recipes.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        backend.replace(collect_documents(recipes, ingredient_recipes, chunk))
+    return len(ids)
+
+
+def search(query, limit):
+    return get_backend().search(query, limit)
@@ -0,0 +1,126 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from PIL import Image
+
+from .models import Recipe
+from .storage import lock_image
+
+logger = logging.getLogger(__name__)
+
+# Карточка в списке и страница рецепта; изображение вписывается в рамку.
+SIZES = {
+    "thumbnail": (480, 360),
+    "detail": (1200, 900),
+}
+FORMATS = {
+    "webp": "WEBP",
+    "jpeg": "JPEG",
+}
+QUALITY = 82
+
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="recipe-images")
+
+
+def image_storage():
+    return Recipe._meta.get_field("image").storage
+
+
+def derivative_storage(storage=None):
+    """Копии лежат рядом с оригиналом, но под предсказуемыми именами:
+    хранилище оригиналов переименовало бы их по хэшу."""
+    storage = storage or image_storage()
+    return FileSystemStorage(location=storage.location, base_url=storage.base_url)
+
+
+def derivative_name(name, size, extension):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "derivatives", f"{stem}_{size}.{extension}")
+
+
+def derivative_names(name):
+    return {
+        size: {
+            extension: derivative_name(name, size, extension) for extension in FORMATS
+        }
+        for size in SIZES
+    }
+
+
+def convert(image, image_format):
+    if image_format == "JPEG":
+        if image.mode in ("RGB", "L"):
+            return image
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    if image.mode not in ("RGB", "RGBA"):
+        return image.convert("RGBA")
+    return image
+
+
+def make_derivatives(name, force=False, storage=None):
+    """Создает уменьшенные копии изображения; возвращает число новых файлов."""
+    storage = storage or image_storage()
+    derivatives = derivative_storage(storage)
+    targets = [
+        (size, extension)
+        for size in SIZES
+        for extension in FORMATS
+        if force or not derivatives.exists(derivative_name(name, size, extension))
+    ]
+    if not targets:
+        return 0
+    with storage.open(name) as file:
+        original = Image.open(file)
+        original.load()
+    for size, extension in targets:
+        image = original.copy()
+        image.thumbnail(SIZES[size], Image.LANCZOS)
+        image = convert(image, FORMATS[extension])
+        buffer = BytesIO()
+        image.save(buffer, FORMATS[extension], quality=QUALITY, optimize=True)
+        target = derivative_name(name, size, extension)
+        if derivatives.exists(target):
+            derivatives.delete(target)
+        derivatives.save(target, ContentFile(buffer.getvalue()))
+    return len(targets)
+
+
+def make_derivatives_safely(name):
+    try:
+        return make_derivatives(name)
+    except Exception:
+        logger.exception("Не удалось обработать изображение %s", name)
+        return 0
+
+
+def schedule_derivatives(name):
+    """Обработка изображения в фоновом потоке, вне цикла запроса."""
+    return executor.submit(make_derivatives_safely, name)
+
+
+def release_image(name):
+    """Удаляет файл и его копии, если на него больше не ссылается ни один рецепт."""
+    if not name:
+        return False
+    with transaction.atomic():
+        # Под блокировкой: загрузка тех же байтов могла взять это имя и еще
+        # не сохранить рецепт со ссылкой на него.
+        locked = lock_image(name)
+        if Recipe.objects.filter(image=name).exists():
+            return False
+        storage = derivative_storage()
+        storage.delete(name)
+        for names in derivative_names(name).values():
+            for derivative in names.values():
+                storage.delete(derivative)
+        locked.delete()
+    return True
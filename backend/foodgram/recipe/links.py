@@ -0,0 +1,63 @@
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+
+
+def execute(model, sql, values):
+    using = router.db_for_write(model)
+    connection = connections[using]
+    fields = [model._meta.get_field(name) for name in values]
+    params = [
+        field.get_db_prep_save(value, connection)
+        for field, value in zip(fields, values.values())
+    ]
+    columns = [connection.ops.quote_name(field.column) for field in fields]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(sql(connection, table, columns), params)
+        return using, cursor.rowcount
+
+
+def insert_sql(connection, table, columns):
+    insert = (
+        f"INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    if connection.vendor == "mysql":
+        return f"INSERT IGNORE {insert}"
+    return f"INSERT {insert} ON CONFLICT DO NOTHING"
+
+
+def delete_sql(connection, table, columns):
+    return f"DELETE FROM {table} WHERE " + " AND ".join(
+        f"{column} = %s" for column in columns
+    )
+
+
+@transaction.atomic
+def add(model, **values):
+    """Создает связь одним INSERT, пропуская уже существующую.
+
+    Возвращает True, если строка добавлена. Сигнал post_save отправляется
+    только в этом случае, поэтому одновременные запросы не сдвигают
+    счетчики дважды и не приводят к IntegrityError.
+    """
+    using, rowcount = execute(model, insert_sql, values)
+    if rowcount:
+        post_save.send(
+            sender=model,
+            instance=model(**values),
+            created=True,
+            update_fields=None,
+            raw=False,
+            using=using,
+        )
+    return bool(rowcount)
+
+
+@transaction.atomic
+def remove(model, **values):
+    """Удаляет связь одним DELETE; True, если строка была."""
+    using, rowcount = execute(model, delete_sql, values)
+    if rowcount:
+        post_delete.send(sender=model, instance=model(**values), using=using)
+    return bool(rowcount)
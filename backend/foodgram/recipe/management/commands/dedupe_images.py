@@ -0,0 +1,93 @@
+import posixpath
+
+from django.core.management.base import BaseCommand
+
+from recipe.images import (
+    derivative_names,
+    derivative_storage,
+    image_storage,
+    release_image,
+)
+from recipe.models import Recipe, StoredImage
+
+
+class Command(BaseCommand):
+    help = (
+        "Перевод изображений рецептов на имена по хэшу содержимого: "
+        "одинаковые файлы объединяются, лишние удаляются"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delete-orphans",
+            action="store_true",
+            help="удалить файлы каталога, на которые не ссылается ни один рецепт",
+        )
+
+    def handle(self, *args, delete_orphans, **options):
+        storage = image_storage()
+        renamed = merged = missing = freed = 0
+        names = (
+            Recipe.objects.exclude(image="")
+            .order_by()
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        for name in list(names):
+            if not storage.exists(name):
+                missing += 1
+                continue
+            with storage.open(name) as file:
+                target = storage.get_content_name(name, file)
+                if target == name:
+                    continue
+                if storage.exists(target):
+                    merged += 1
+                else:
+                    storage.save(target, file)
+                    renamed += 1
+            size = storage.size(name)
+            Recipe.objects.filter(image=name).update(image=target)
+            if release_image(name):
+                freed += size
+        orphans = 0
+        if delete_orphans:
+            directory = Recipe._meta.get_field("image").upload_to.rstrip("/")
+            referenced = set(
+                Recipe.objects.exclude(image="").values_list("image", flat=True)
+            )
+            for filename in storage.listdir(directory)[1]:
+                name = posixpath.join(directory, filename)
+                if name not in referenced and release_image(name):
+                    orphans += 1
+            # Строки-замки файлов, которые уже удалены.
+            for name in list(StoredImage.objects.values_list("name", flat=True)):
+                if name not in referenced:
+                    release_image(name)
+            # Копии без оригинала, в том числе переименованные по хэшу
+            # прежней версией make_derivatives.
+            expected = {
+                derivative
+                for name in referenced
+                for names in derivative_names(name).values()
+                for derivative in names.values()
+            }
+            derivatives = derivative_storage(storage)
+            folder = posixpath.join(directory, "derivatives")
+            if derivatives.exists(folder):
+                for filename in derivatives.listdir(folder)[1]:
+                    name = posixpath.join(folder, filename)
+                    if name not in expected:
+                        derivatives.delete(name)
+                        orphans += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Переименовано: {renamed}, объединено с существующими: {merged}, "
+                f"не найдено: {missing}, удалено лишних файлов: {orphans}, "
+                f"освобождено {freed / 1024:.1f} КиБ"
+            )
+        )
+        if renamed:
+            self.stdout.write(
+                "Для новых имен запустите make_image_derivatives"
+            )
@@ -0,0 +1,99 @@
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipe.models import Ingredient
+from recipe.search import ingredient_index
+
+CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as file:
+        for row in csv.reader(file):
+            if len(row) != 2:
+                raise CommandError(f"Неверная строка в {path}: {row}")
+            yield row[0], row[1]
+
+
+def read_json(path):
+    """Читает массив объектов по частям, не загружая весь файл в память."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    opened = False
+    with open(path, encoding="utf-8") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), ""):
+            buffer += chunk
+            if not opened:
+                buffer = buffer.lstrip()
+                if not buffer:
+                    continue
+                if buffer[0] != "[":
+                    raise CommandError(f"{path} должен содержать JSON-массив")
+                buffer = buffer[1:]
+                opened = True
+            while True:
+                buffer = buffer.lstrip().lstrip(",").lstrip()
+                if buffer.startswith("]"):
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    break
+                buffer = buffer[end:]
+                yield item["name"], item["measurement_unit"]
+    raise CommandError(f"{path}: неожиданный конец файла")
+
+
+READERS = {
+    ".csv": read_csv,
+    ".json": read_json,
+}
+
+
+class Command(BaseCommand):
+    help = "Загрузка справочника ингредиентов из CSV или JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, path, batch_size, **options):
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError("Поддерживаются только файлы .csv и .json")
+        if not os.path.exists(path):
+            raise CommandError(f"Файл {path} не найден")
+        start = time.perf_counter()
+        read = created = 0
+        with transaction.atomic():
+            seen = set(Ingredient.objects.values_list("name", "measurement_unit"))
+            batch = []
+            for name, measurement_unit in reader(path):
+                read += 1
+                key = (name.strip(), measurement_unit.strip())
+                if not key[0] or key in seen:
+                    continue
+                seen.add(key)
+                batch.append(
+                    Ingredient(name=key[0], measurement_unit=key[1], amount=1)
+                )
+                if len(batch) >= batch_size:
+                    Ingredient.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            Ingredient.objects.bulk_create(batch)
+            created += len(batch)
+        if created:
+            ingredient_index.invalidate()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Прочитано {read}, добавлено {created} ингредиентов "
+                f"за {elapsed:.2f} с ({read / max(elapsed, 1e-9):.0f} строк/с)"
+            )
+        )
@@ -0,0 +1,49 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from recipe.images import make_derivatives
+from recipe.models import Recipe
+
+
+def process(name, force):
+    try:
+        return name, make_derivatives(name, force=force), None
+    except Exception as error:
+        return name, 0, repr(error)
+
+
+class Command(BaseCommand):
+    help = "Создание уменьшенных копий и WebP для уже загруженных изображений"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument(
+            "--force", action="store_true", help="пересоздать существующие файлы"
+        )
+
+    def handle(self, *args, workers, force, **options):
+        names = sorted(
+            set(Recipe.objects.exclude(image="").values_list("image", flat=True))
+        )
+        connections.close_all()
+        start = time.perf_counter()
+        created = failed = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for name, count, error in executor.map(
+                partial(process, force=force), names, chunksize=8
+            ):
+                created += count
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Изображений: {len(names)}, создано файлов: {created}, "
+                f"ошибок: {failed}, {time.perf_counter() - start:.1f} с"
+            )
+        )
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.feed import FEED_LENGTH, rebuild, trim
+
+
+class Command(BaseCommand):
+    help = "Заполнение лент подписок по текущим подпискам и рецептам"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, nargs="+", help="id подписчиков")
+        parser.add_argument("--length", type=int, default=FEED_LENGTH)
+        parser.add_argument(
+            "--trim", action="store_true", help="только обрезать длинные ленты"
+        )
+
+    def handle(self, *args, users=None, length=FEED_LENGTH, **options):
+        start = time.perf_counter()
+        with transaction.atomic():
+            if options["trim"]:
+                message = f"Удалено записей: {trim(users, length, slack=0)}"
+            else:
+                message = f"Записано в ленты: {rebuild(users, length)}"
+        self.stdout.write(
+            self.style.SUCCESS(f"{message} за {time.perf_counter() - start:.1f} с")
+        )
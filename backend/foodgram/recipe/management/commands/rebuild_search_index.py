@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.fulltext import rebuild
+from recipe.models import IngredientRecipe, Recipe
+
+
+class Command(BaseCommand):
+    help = "Полная перестройка полнотекстового индекса рецептов"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with transaction.atomic():
+            count = rebuild(Recipe.objects, IngredientRecipe.objects)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проиндексировано рецептов: {count} "
+                f"за {time.perf_counter() - start:.1f} с"
+            )
+        )
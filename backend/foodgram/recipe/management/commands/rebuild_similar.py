@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipe.similar import CHUNK_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = "Пересчет MinHash-подписей и корзин для похожих рецептов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, chunk_size=CHUNK_SIZE, **options):
+        start = time.perf_counter()
+        total = rebuild(chunk_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Подписей: {total} за {time.perf_counter() - start:.1f} с"
+            )
+        )
@@ -0,0 +1,62 @@
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import IntegerField, Value
+
+from .models import Favorite, ShoppingCart
+from .versions import get_version
+
+# Сброс работает через версию в общем кэше (CACHES в settings, проверка
+# recipe.W001). Короткий срок жизни ограничивает устаревание, если сброс
+# все же не дошел: например, версия вытеснена или кэш оказался локальным.
+ENTRY_TTL = 60
+
+Membership = namedtuple("Membership", ("favorites", "cart"))
+
+EMPTY = Membership(frozenset(), frozenset())
+
+
+def version_key(user_id):
+    return f"recipe:membership_version:{user_id}"
+
+
+def load(user_id):
+    favorites, cart = set(), set()
+    rows = (
+        Favorite.objects.filter(user_id=user_id)
+        .annotate(kind=Value(0, output_field=IntegerField()))
+        .values_list("kind", "recipe_id")
+        .union(
+            ShoppingCart.objects.filter(user_id=user_id)
+            .annotate(kind=Value(1, output_field=IntegerField()))
+            .values_list("kind", "recipe_id"),
+            all=True,
+        )
+    )
+    for kind, recipe_id in rows:
+        (cart if kind else favorites).add(recipe_id)
+    return Membership(frozenset(favorites), frozenset(cart))
+
+
+def get_membership(user):
+    """Id рецептов в избранном и в списке покупок пользователя.
+
+    Наборы загружаются одним запросом и хранятся в кэше под номером версии,
+    который увеличивается при каждом изменении. Набор, прочитанный до
+    изменения, остается под старым номером и больше не используется.
+    """
+    if user is None or not user.is_authenticated:
+        return EMPTY
+    key = f"recipe:membership:{user.pk}:{get_version(version_key(user.pk))}"
+    entry = cache.get(key)
+    if entry is None:
+        entry = load(user.pk)
+        cache.set(key, entry, ENTRY_TTL)
+    return entry
+
+
+def invalidate(user_id):
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        pass
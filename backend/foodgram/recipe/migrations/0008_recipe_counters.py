@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ("recipe.Favorite", "recipe", "recipe.Recipe", "favorites_count"),
+    ("recipe.ShoppingCart", "recipe", "recipe.Recipe", "in_carts_count"),
+    ("recipe.Recipe", "author", settings.AUTH_USER_MODEL, "recipes_count"),
+    ("recipe.Follow", "author", settings.AUTH_USER_MODEL, "followers_count"),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for source, key, target, field in COUNTERS:
+        source = apps.get_model(source)
+        apps.get_model(target).objects.update(
+            **{
+                field: Coalesce(
+                    Subquery(
+                        source.objects.filter(**{key: OuterRef("pk")})
+                        .order_by()
+                        .values(key)
+                        .annotate(count=Count("pk"))
+                        .values("count")
+                    ),
+                    0,
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipe", "0007_ingredient_amount"),
+        ("users", "0009_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В избранном"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="in_carts_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В списках покупок"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+import recipe.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipe", "0009_shoppinglistjob"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                db_index=True,
+                storage=recipe.storage.ContentAddressedStorage(),
+                upload_to="media/recipes/images/",
+                verbose_name="Картинка",
+            ),
+        ),
+    ]
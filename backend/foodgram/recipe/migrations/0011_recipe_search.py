@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# Схема и заполнение индекса на момент этой миграции. Код recipe.fulltext
+# здесь не используется, чтобы его изменения не меняли историю.
+SQL = {
+    "sqlite": (
+        (
+            "CREATE VIRTUAL TABLE IF NOT EXISTS recipe_search USING fts5("
+            "name, text, ingredients, tokenize = 'unicode61 remove_diacritics 2')"
+        ),
+        (
+            "INSERT INTO recipe_search (rowid, name, text, ingredients) "
+            "SELECT recipe.id, recipe.name, recipe.text, COALESCE(("
+            "SELECT group_concat(ingredient.name, ' ') "
+            "FROM recipe_ingredientrecipe link "
+            "JOIN recipe_ingredient ingredient ON ingredient.id = link.ingredient_id "
+            "WHERE link.recipe_id = recipe.id), '') "
+            "FROM recipe_recipe recipe"
+        ),
+    ),
+    "postgresql": (
+        (
+            "CREATE TABLE IF NOT EXISTS recipe_search ("
+            "recipe_id integer PRIMARY KEY "
+            "REFERENCES recipe_recipe (id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        ),
+        (
+            "CREATE INDEX IF NOT EXISTS recipe_search_document "
+            "ON recipe_search USING GIN (document)"
+        ),
+        (
+            "INSERT INTO recipe_search (recipe_id, document) "
+            "SELECT recipe.id, "
+            "setweight(to_tsvector('russian', recipe.name), 'A') || "
+            "setweight(to_tsvector('russian', recipe.text), 'C') || "
+            "setweight(to_tsvector('russian', "
+            "COALESCE(string_agg(ingredient.name, ' '), '')), 'B') "
+            "FROM recipe_recipe recipe "
+            "LEFT JOIN recipe_ingredientrecipe link ON link.recipe_id = recipe.id "
+            "LEFT JOIN recipe_ingredient ingredient "
+            "ON ingredient.id = link.ingredient_id "
+            "GROUP BY recipe.id "
+            "ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document"
+        ),
+    ),
+}
+
+
+def run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def create_index(apps, schema_editor):
+    # Для остальных баз поиск идет через LIKE без отдельной таблицы.
+    run(schema_editor, SQL.get(schema_editor.connection.vendor, ()))
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in SQL:
+        run(schema_editor, ["DROP TABLE IF EXISTS recipe_search"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipe", "0010_recipe_image_storage"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+# Фильтр по тэгам выбирает recipe_id по tag_id IN (...): составной индекс
+# отдает id рецептов, не читая саму таблицу связей.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipe", "0012_feedentry"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX recipe_recipe_tags_tag_recipe_idx "
+            "ON recipe_recipe_tags (tag_id, recipe_id)",
+            "DROP INDEX recipe_recipe_tags_tag_recipe_idx",
+        ),
+    ]
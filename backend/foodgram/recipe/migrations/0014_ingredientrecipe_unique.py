@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    IngredientRecipe = apps.get_model("recipe", "IngredientRecipe")
+    duplicates = (
+        IngredientRecipe.objects.values("recipe_id", "ingredient_id")
+        .annotate(rows=Count("pk"), first=Min("pk"), total=Sum("amount"))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        IngredientRecipe.objects.filter(pk=row["first"]).update(amount=row["total"])
+        IngredientRecipe.objects.filter(
+            recipe_id=row["recipe_id"], ingredient_id=row["ingredient_id"]
+        ).exclude(pk=row["first"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipe", "0013_recipe_tags_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="ingredientrecipe",
+            constraint=models.UniqueConstraint(
+                fields=("recipe", "ingredient"), name="unique_recipe_ingredient"
+            ),
+        ),
+    ]
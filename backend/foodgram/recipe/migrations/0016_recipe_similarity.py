@@ -0,0 +1,62 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipe", "0015_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeSignature",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="signature",
+                        serialize=False,
+                        to="recipe.Recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                ("signature", models.BinaryField(verbose_name="Подпись")),
+            ],
+            options={
+                "verbose_name": "Подпись рецепта",
+            },
+        ),
+        migrations.CreateModel(
+            name="RecipeBucket",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.BigIntegerField(db_index=True, verbose_name="Ключ полосы"),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="buckets",
+                        to="recipe.Recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Корзина похожих рецептов",
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipe", "0016_recipe_similarity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shoppinglistjob",
+            name="claimed",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Взято воркером"
+            ),
+        ),
+        migrations.AddField(
+            model_name="shoppinglistjob",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(
+                default=0, verbose_name="Попыток"
+            ),
+        ),
+    ]
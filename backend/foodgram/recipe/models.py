@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -17,7 +19,9 @@ class Tag(models.Model):
 
 
 class Ingredient(models.Model):
-    name = models.CharField(max_length=256, verbose_name="Название ингридиента")
+    name = models.CharField(
+        max_length=256, db_index=True, verbose_name="Название ингридиента"
+    )
     measurement_unit = models.CharField(max_length=64, verbose_name="единица измерения")
     amount = models.PositiveSmallIntegerField(blank=True, verbose_name="Количество")
 
@@ -45,14 +49,26 @@ class Recipe(models.Model):
     )
     text = models.TextField(verbose_name="Текст рецепта")
     image = models.ImageField(
-        verbose_name="Картинка", upload_to="media/recipes/images/"
+        verbose_name="Картинка",
+        upload_to="media/recipes/images/",
+        storage=ContentAddressedStorage(),
+        db_index=True,
     )
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name="Время приготовления в минутах",
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="В избранном"
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="В списках покупок"
+    )
 
     class Meta:
         verbose_name = "Рецепт"
+        indexes = [
+            models.Index(fields=["author", "-id"], name="recipe_author_newest_idx")
+        ]
 
 
 class IngredientRecipe(models.Model):
@@ -72,6 +88,11 @@ class IngredientRecipe(models.Model):
 
     class Meta:
         verbose_name = "Ингредиент для рецепта"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "ingredient"], name="unique_recipe_ingredient"
+            )
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -136,6 +157,114 @@ class Follow(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["user", "author"], name="unique_follow")
         ]
+        indexes = [
+            models.Index(fields=["author", "user"], name="follow_author_user_idx")
+        ]
 
     def __str__(self):
         return f"{self.user}, {self.author}"
+
+
+class ShoppingListJob(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Готово"),
+        (FAILED, "Ошибка"),
+    )
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="Пользователь",
+        related_name="shopping_list_jobs",
+        on_delete=models.CASCADE,
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+        db_index=True,
+        verbose_name="Статус",
+    )
+    digest = models.CharField(
+        max_length=64, blank=True, verbose_name="Хэш содержимого списка"
+    )
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    finished = models.DateTimeField(null=True, blank=True, verbose_name="Завершено")
+    claimed = models.DateTimeField(
+        null=True, blank=True, verbose_name="Взято воркером"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Попыток")
+
+    class Meta:
+        verbose_name = "Задача на список покупок"
+
+
+class FeedEntry(models.Model):
+    """Рецепт автора в ленте подписчика: строки пишутся при публикации."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="Подписчик",
+        related_name="feed",
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name="Рецепт",
+        related_name="feed_entries",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = "Запись ленты подписок"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "recipe"], name="unique_feed_entry")
+        ]
+
+
+class RecipeSignature(models.Model):
+    """MinHash-подпись набора ингредиентов рецепта."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        verbose_name="Рецепт",
+        related_name="signature",
+        on_delete=models.CASCADE,
+    )
+    signature = models.BinaryField(verbose_name="Подпись")
+
+    class Meta:
+        verbose_name = "Подпись рецепта"
+
+
+class RecipeBucket(models.Model):
+    """Корзина LSH: рецепты с общим ключом полосы подписи - кандидаты
+    в похожие."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name="Рецепт",
+        related_name="buckets",
+        on_delete=models.CASCADE,
+    )
+    key = models.BigIntegerField(db_index=True, verbose_name="Ключ полосы")
+
+    class Meta:
+        verbose_name = "Корзина похожих рецептов"
+
+
+class StoredImage(models.Model):
+    """Строка-замок для файла изображения: загрузка и удаление файла с одним
+    и тем же именем идут по очереди."""
+
+    name = models.CharField(max_length=255, unique=True, verbose_name="Имя файла")
+
+    class Meta:
+        verbose_name = "Файл изображения"
@@ -0,0 +1,136 @@
+from collections import namedtuple
+
+import numpy as np
+from django.core.cache import cache
+
+from .models import IngredientRecipe
+from .versions import VersionedIndex, bump_version
+
+VERSION_KEY = "recipe:pantry_version"
+CHANGE_TTL = 60 * 60
+# Сколько изменений воркер догоняет по журналу; дальше индекс строится заново.
+MAX_CHANGES = 1000
+MAX_OVERLAY = 5000
+
+PantryData = namedtuple(
+    "PantryData", ("ingredients", "offsets", "postings", "recipes", "sizes", "overlay")
+)
+
+
+def change_key(number):
+    return f"recipe:pantry_change:{number}"
+
+
+def load_sets(recipe_ids):
+    sets = {recipe_id: set() for recipe_id in recipe_ids}
+    for recipe_id, ingredient_id in IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list("recipe_id", "ingredient_id"):
+        sets[recipe_id].add(ingredient_id)
+    return {recipe_id: frozenset(items) for recipe_id, items in sets.items()}
+
+
+class PantryIndex(VersionedIndex):
+    """Инвертированный индекс ингредиент -> рецепты в памяти процесса.
+
+    Списки рецептов хранятся одним массивом NumPy по ингредиентам (как CSR),
+    поэтому подбор по продуктам - это склейка нескольких срезов и bincount.
+    Изменения рецептов пишутся в журнал в кэше: воркер догоняет его,
+    перечитывая только измененные рецепты, и держит их поверх основного
+    индекса, пока их не станет слишком много. После вытеснения версии из
+    кэша ее начальное значение от времени дает скачок больше MAX_CHANGES,
+    и индекс строится заново.
+    """
+
+    version_key = VERSION_KEY
+
+    def invalidate(self, recipe_ids):
+        for recipe_id in recipe_ids:
+            number = bump_version(VERSION_KEY)
+            cache.set(change_key(number), recipe_id, CHANGE_TTL)
+
+    def reset(self):
+        """Все воркеры перестроят индекс целиком: записи в журнале о новой
+        версии нет, догнать ее нельзя."""
+        self._data = None
+        bump_version(VERSION_KEY)
+
+    def _build(self):
+        pairs = np.array(
+            IngredientRecipe.objects.order_by()
+            .values_list("ingredient_id", "recipe_id"),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        recipes, positions = np.unique(pairs[:, 1], return_inverse=True)
+        order = np.argsort(pairs[:, 0], kind="stable")
+        ingredients, counts = np.unique(pairs[order, 0], return_counts=True)
+        offsets = np.zeros(len(ingredients) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        postings = positions[order].astype(np.int32)
+        sizes = np.bincount(positions, minlength=len(recipes)).astype(np.int32)
+        return PantryData(ingredients, offsets, postings, recipes, sizes, {})
+
+    def _catch_up(self, data, start, end):
+        numbers = range(start + 1, end + 1)
+        changes = cache.get_many([change_key(number) for number in numbers])
+        if len(changes) < len(numbers):
+            return None
+        overlay = dict(data.overlay)
+        overlay.update(load_sets(set(changes.values())))
+        if len(overlay) > MAX_OVERLAY:
+            return None
+        return data._replace(overlay=overlay)
+
+    def _refresh(self, data, version, new_version):
+        if 0 < new_version - version <= MAX_CHANGES:
+            data = self._catch_up(data, version, new_version)
+            if data is not None:
+                return data
+        return self._build()
+
+    def match(self, ingredient_ids, limit=20):
+        """Рецепты, в которых есть хотя бы один из ингредиентов.
+
+        Сначала те, где докупать меньше всего, затем с большим числом
+        совпадений, затем новые. Возвращает тройки (id рецепта, совпало,
+        не хватает).
+        """
+        pantry = np.unique(np.asarray(list(ingredient_ids), dtype=np.int64))
+        data = self._get()
+        positions = np.searchsorted(data.ingredients, pantry)
+        positions = positions[positions < len(data.ingredients)]
+        positions = positions[np.isin(data.ingredients[positions], pantry)]
+        have = np.zeros(len(data.recipes), dtype=np.int32)
+        if len(positions):
+            have = np.bincount(
+                np.concatenate(
+                    [
+                        data.postings[data.offsets[i]:data.offsets[i + 1]]
+                        for i in positions
+                    ]
+                ),
+                minlength=len(data.recipes),
+            )
+        if data.overlay:
+            changed = np.fromiter(data.overlay, dtype=np.int64)
+            stored = np.searchsorted(data.recipes, changed)
+            inside = stored < len(data.recipes)
+            stored, changed = stored[inside], changed[inside]
+            have[stored[data.recipes[stored] == changed]] = 0
+        found = np.flatnonzero(have)
+        missing = data.sizes[found] - have[found]
+        order = np.lexsort((-data.recipes[found], -have[found], missing))[:limit]
+        result = [
+            (int(data.recipes[found[i]]), int(have[found[i]]), int(missing[i]))
+            for i in order
+        ]
+        pantry_set = set(pantry.tolist())
+        for recipe_id, items in data.overlay.items():
+            matched = len(items & pantry_set)
+            if matched:
+                result.append((recipe_id, matched, len(items) - matched))
+        result.sort(key=lambda row: (row[2], -row[1], -row[0]))
+        return result[:limit]
+
+
+pantry_index = PantryIndex()
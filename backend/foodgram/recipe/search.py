@@ -0,0 +1,90 @@
+import bisect
+import heapq
+from collections import Counter, defaultdict
+
+from .models import Ingredient
+from .versions import VersionedIndex, bump_version
+
+VERSION_KEY = "ingredient_index_version"
+
+
+def trigrams(text):
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class IngredientIndex(VersionedIndex):
+    """Индекс справочника ингредиентов в памяти процесса.
+
+    Строится лениво при первом поиске. Поиск по началу названия идёт по
+    отсортированному списку, поиск по вхождению и с опечатками - по
+    триграммам. Версия в кэше позволяет сбросить индекс во всех воркерах.
+    """
+
+    version_key = VERSION_KEY
+
+    def invalidate(self):
+        self._data = None
+        bump_version(VERSION_KEY)
+
+    def _build(self):
+        rows = sorted(
+            (name.lower(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                "id", "name", "measurement_unit"
+            )
+        )
+        keys = [row[0] for row in rows]
+        grams = defaultdict(list)
+        sizes = []
+        for position, key in enumerate(keys):
+            key_grams = trigrams(key)
+            sizes.append(len(key_grams))
+            for gram in key_grams:
+                grams[gram].append(position)
+        return rows, keys, grams, sizes
+
+    def search(self, query, limit=20, similarity=0.3):
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+        rows, keys, grams, sizes = self._get()
+        found = []
+        position = bisect.bisect_left(keys, query)
+        while (
+            len(found) < limit
+            and position < len(keys)
+            and keys[position].startswith(query)
+        ):
+            found.append(position)
+            position += 1
+        if len(found) < limit:
+            query_grams = trigrams(query)
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(grams.get(gram, ()))
+            prefixed = set(found)
+            scored = []
+            for position, count in shared.items():
+                if position in prefixed:
+                    continue
+                score = count / (len(query_grams) + sizes[position] - count)
+                if query in keys[position]:
+                    score += 1
+                if score >= similarity:
+                    scored.append((-score, keys[position], position))
+            found.extend(
+                position
+                for _, _, position in heapq.nsmallest(limit - len(found), scored)
+            )
+        return [
+            {
+                "id": rows[position][1],
+                "name": rows[position][2],
+                "measurement_unit": rows[position][3],
+            }
+            for position in found
+        ]
+
+
+ingredient_index = IngredientIndex()
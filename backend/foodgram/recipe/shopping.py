@@ -0,0 +1,76 @@
+import csv
+
+from django.db.models import Sum
+
+from .models import IngredientRecipe, ShoppingCart
+
+STREAM_CHUNK_SIZE = 2000
+FIELDS = ("ingredient__name", "ingredient__measurement_unit", "amount")
+HEADER = ("Ингредиент", "Единица измерения", "Количество")
+
+
+def get_shopping_list(user):
+    return (
+        IngredientRecipe.objects.filter(recipe__shopping_cart__user=user)
+        .values("ingredient__name", "ingredient__measurement_unit")
+        .annotate(amount=Sum("amount"))
+        .order_by("ingredient__name", "ingredient__measurement_unit")
+    )
+
+
+def get_shopping_lists(users):
+    """Списки покупок нескольких пользователей одним запросом для выгрузки."""
+    return (
+        ShoppingCart.objects.filter(user__in=users)
+        .values(
+            "user__email",
+            "recipe__ingredient_recipe__ingredient__name",
+            "recipe__ingredient_recipe__ingredient__measurement_unit",
+        )
+        .annotate(amount=Sum("recipe__ingredient_recipe__amount"))
+        .filter(amount__isnull=False)
+        .order_by(
+            "user__email",
+            "recipe__ingredient_recipe__ingredient__name",
+            "recipe__ingredient_recipe__ingredient__measurement_unit",
+        )
+    )
+
+
+def iter_rows(queryset, fields=FIELDS):
+    """Строки агрегированного запроса порциями, без загрузки всего списка."""
+    return queryset.values_list(*fields).iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+
+class Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def chunked(lines):
+    # Ответ собирается кусками по STREAM_CHUNK_SIZE строк, а не по одной.
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def stream_csv(rows, header=HEADER):
+    writer = csv.writer(Echo())
+    # BOM, чтобы Excel открывал кириллицу без выбора кодировки.
+    yield "\ufeff" + writer.writerow(header)
+    yield from chunked(writer.writerow(row) for row in rows)
+
+
+def stream_txt(rows):
+    yield "Список покупок\n\n"
+    yield from chunked(
+        f"{name} ({measurement_unit}) - {amount}\n"
+        for name, measurement_unit, amount in rows
+    )
@@ -0,0 +1,150 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import feed
+from .counters import COUNTERS, change_counter
+from .fulltext import get_backend, index_recipes, reindex_ingredient
+from .images import release_image, schedule_derivatives
+from .membership import invalidate as invalidate_membership
+from .models import (
+    Favorite,
+    Follow,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart,
+)
+from .pantry import pantry_index
+from .search import ingredient_index
+from .similar import update as update_similar
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    transaction.on_commit(ingredient_index.invalidate)
+
+
+def image_name(value):
+    return getattr(value, "name", value) or ""
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(instance, **kwargs):
+    instance._loaded_image = image_name(instance.__dict__.get("image"))
+
+
+@receiver(post_save, sender=Recipe)
+def make_image_derivatives(instance, raw=False, **kwargs):
+    if raw:
+        return
+    name = instance.image.name
+    previous = instance._loaded_image
+    if name:
+        transaction.on_commit(lambda: schedule_derivatives(name))
+    if previous and previous != name:
+        transaction.on_commit(lambda: release_image(previous))
+    instance._loaded_image = name
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image(instance, **kwargs):
+    name = instance.image.name
+    transaction.on_commit(lambda: release_image(name))
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(instance, raw=False, **kwargs):
+    if not raw:
+        pk = instance.pk
+        transaction.on_commit(lambda: index_recipes([pk]))
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: get_backend().delete([pk]))
+
+
+@receiver(post_init, sender=Ingredient)
+def remember_ingredient_name(instance, **kwargs):
+    instance._loaded_name = instance.__dict__.get("name")
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_renamed_ingredient(instance, created, raw=False, **kwargs):
+    # Название ингредиента входит в документ каждого рецепта с ним.
+    if raw or created or instance.name == instance._loaded_name:
+        return
+    instance._loaded_name = instance.name
+    pk = instance.pk
+    transaction.on_commit(lambda: reindex_ingredient(pk))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+def refresh_signature(instance, raw=False, **kwargs):
+    # Сериализатор пересоздает ингредиенты bulk_create без сигналов, но в той
+    # же транзакции сохраняет рецепт; подпись считается уже после коммита.
+    # post_delete для IngredientRecipe не слушаем, чтобы каскадное удаление
+    # рецепта оставалось одним DELETE.
+    if not raw:
+        pk = getattr(instance, "recipe_id", instance.pk)
+        transaction.on_commit(lambda: update_similar([pk]))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_pantry(instance, raw=False, **kwargs):
+    if not raw:
+        pk = getattr(instance, "recipe_id", instance.pk)
+        transaction.on_commit(lambda: pantry_index.invalidate([pk]))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def bump_membership(instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_membership(user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def push_to_feeds(instance, created, raw=False, **kwargs):
+    if created and not raw:
+        pk, author_id = instance.pk, instance.author_id
+        transaction.on_commit(lambda: feed.push(pk, author_id))
+
+
+@receiver(post_save, sender=Follow)
+def fill_feed(instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_feed(instance, **kwargs):
+    feed.unfollow(instance.user_id, instance.author_id)
+
+
+def connect_counter(source, key, model, field):
+    def increment(instance, created, raw=False, **kwargs):
+        if created and not raw:
+            change_counter(model, field, getattr(instance, f"{key}_id"), 1)
+
+    def decrement(instance, **kwargs):
+        change_counter(model, field, getattr(instance, f"{key}_id"), -1)
+
+    post_save.connect(
+        increment, sender=source, weak=False, dispatch_uid=f"{field}_increment"
+    )
+    post_delete.connect(
+        decrement, sender=source, weak=False, dispatch_uid=f"{field}_decrement"
+    )
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
@@ -0,0 +1,142 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+
+from .models import IngredientRecipe, Recipe, RecipeBucket, RecipeSignature
+
+# 64 хэш-функции делятся на 16 полос по 4 строки: рецепты попадают в одну
+# корзину хотя бы по одной полосе с вероятностью 1 - (1 - J^4)^16, то есть
+# порог похожести около 0.5 по Жаккару.
+PERMUTATIONS = 64
+BANDS = 16
+ROWS = PERMUTATIONS // BANDS
+PRIME = (1 << 31) - 1
+MAX_CANDIDATES = 500
+CHUNK_SIZE = 2000
+
+random = np.random.RandomState(20220316)
+A = random.randint(1, PRIME, PERMUTATIONS).astype(np.int64)
+B = random.randint(0, PRIME, PERMUTATIONS).astype(np.int64)
+MIX = random.randint(1, 1 << 62, ROWS, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+SALT = np.arange(BANDS, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+
+
+def compute_signatures(recipe_ids, ingredient_ids):
+    """Подписи для пар (рецепт, ингредиент), отсортированных по рецепту.
+
+    Возвращает id рецептов и матрицу подписей (рецепт x хэш-функция).
+    """
+    recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+    ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+    if not len(recipe_ids):
+        return recipe_ids, np.empty((0, PERMUTATIONS), dtype=np.uint32)
+    starts = np.flatnonzero(np.r_[True, recipe_ids[1:] != recipe_ids[:-1]])
+    hashes = (A[:, None] * ingredient_ids[None, :] + B[:, None]) % PRIME
+    signatures = np.minimum.reduceat(hashes, starts, axis=1).T
+    return recipe_ids[starts], signatures.astype(np.uint32)
+
+
+def band_keys(signatures):
+    """Ключи корзин: каждая полоса подписи сворачивается в одно 64-битное
+    число вместе с номером полосы."""
+    with np.errstate(over="ignore"):
+        bands = signatures.astype(np.uint64).reshape(-1, BANDS, ROWS)
+        keys = (bands * MIX).sum(axis=2) + SALT
+        keys ^= keys >> np.uint64(33)
+        keys *= np.uint64(0xFF51AFD7ED558CCD)
+        keys ^= keys >> np.uint64(33)
+    return keys.view(np.int64)
+
+
+def load_pairs(recipe_ids):
+    pairs = np.array(
+        IngredientRecipe.objects.filter(recipe_id__in=recipe_ids)
+        .order_by("recipe_id")
+        .values_list("recipe_id", "ingredient_id"),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def write(recipe_ids, signatures):
+    keys = band_keys(signatures)
+    RecipeSignature.objects.bulk_create(
+        RecipeSignature(recipe_id=int(recipe_id), signature=signature.tobytes())
+        for recipe_id, signature in zip(recipe_ids, signatures.astype("<u4"))
+    )
+    RecipeBucket.objects.bulk_create(
+        RecipeBucket(recipe_id=int(recipe_id), key=int(key))
+        for recipe_id, row in zip(recipe_ids, keys)
+        for key in row
+    )
+
+
+@transaction.atomic
+def update(recipe_ids):
+    """Пересчитывает подписи и корзины для переданных рецептов."""
+    recipe_ids = list(recipe_ids)
+    RecipeSignature.objects.filter(recipe_id__in=recipe_ids).delete()
+    RecipeBucket.objects.filter(recipe_id__in=recipe_ids).delete()
+    write(*compute_signatures(*load_pairs(recipe_ids)))
+
+
+@transaction.atomic
+def rebuild(chunk_size=CHUNK_SIZE):
+    """Полный пересчет таблиц подписей и корзин. Возвращает число рецептов."""
+    RecipeSignature.objects.all().delete()
+    RecipeBucket.objects.all().delete()
+    total = 0
+    last = 0
+    while True:
+        recipe_ids = list(
+            Recipe.objects.filter(pk__gt=last)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:chunk_size]
+        )
+        if not recipe_ids:
+            return total
+        last = recipe_ids[-1]
+        found, signatures = compute_signatures(*load_pairs(recipe_ids))
+        write(found, signatures)
+        total += len(found)
+
+
+def unpack(blobs):
+    return np.frombuffer(b"".join(blobs), dtype="<u4").reshape(-1, PERMUTATIONS)
+
+
+def find_similar(recipe_id, limit=6):
+    """Похожие рецепты по оценке Жаккара из MinHash-подписей.
+
+    Кандидаты берутся из общих корзин LSH, поэтому сравнивается не весь
+    каталог, а не больше MAX_CANDIDATES рецептов. Возвращает список пар
+    (id рецепта, похожесть), самые похожие первыми.
+    """
+    blob = (
+        RecipeSignature.objects.filter(recipe_id=recipe_id)
+        .values_list("signature", flat=True)
+        .first()
+    )
+    if blob is None:
+        return []
+    signature = unpack([blob])
+    keys = [int(key) for key in band_keys(signature)[0]]
+    candidates = (
+        RecipeBucket.objects.filter(key__in=keys)
+        .exclude(recipe_id=recipe_id)
+        .values("recipe_id")
+        .annotate(hits=Count("pk"))
+        .order_by("-hits", "-recipe_id")
+        .values_list("recipe_id", flat=True)[:MAX_CANDIDATES]
+    )
+    rows = list(
+        RecipeSignature.objects.filter(recipe_id__in=candidates).values_list(
+            "recipe_id", "signature"
+        )
+    )
+    if not rows:
+        return []
+    ids = np.array([row[0] for row in rows])
+    scores = (unpack([row[1] for row in rows]) == signature).mean(axis=1)
+    order = np.lexsort((-ids, -scores))[:limit]
+    return [(int(ids[i]), float(scores[i])) for i in order]
@@ -0,0 +1,54 @@
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+def lock_image(name):
+    """Блокирует имя файла до конца текущей транзакции.
+
+    Удаление файла ждет, пока не завершится транзакция, которая его загрузила,
+    и поэтому видит сохраненную ею ссылку из рецепта.
+    """
+    from .models import StoredImage
+
+    while True:
+        StoredImage.objects.get_or_create(name=name)
+        # Строку могли удалить вместе с файлом, пока мы ждали блокировку;
+        # тогда создаем ее заново.
+        locked = StoredImage.objects.select_for_update().filter(name=name).first()
+        if locked is not None:
+            return locked
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла - sha256 его содержимого.
+
+    Повторная загрузка тех же байтов не создает новый файл, а возвращает
+    имя уже сохраненного.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(directory, f"{digest.hexdigest()}{extension}")
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        with transaction.atomic():
+            lock_image(name)
+            if self.exists(name):
+                return name
+            return super().save(name, content, max_length=max_length)
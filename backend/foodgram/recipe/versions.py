@@ -0,0 +1,63 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    """Номер версии из общего кэша.
+
+    Начальное значение берется от времени: если ключ вытеснен, новая версия
+    не совпадет ни с одной из прежних, и устаревшие данные под старыми
+    номерами больше не будут прочитаны.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Увеличивает версию и возвращает новый номер."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        get_version(key)
+        return cache.incr(key)
+
+
+class VersionedIndex:
+    """Данные в памяти процесса, которые перестраиваются при смене версии
+    в общем кэше.
+
+    Наследники задают version_key и _build; _refresh может переиспользовать
+    прежние данные вместо полной сборки.
+    """
+
+    version_key = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+
+    def _build(self):
+        raise NotImplementedError
+
+    def _refresh(self, data, version, new_version):
+        return self._build()
+
+    def _get(self):
+        version = get_version(self.version_key)
+        data = self._data
+        if data is None or version != self._version:
+            with self._lock:
+                if self._data is None or version != self._version:
+                    if self._data is None:
+                        self._data = self._build()
+                    else:
+                        self._data = self._refresh(self._data, self._version, version)
+                    self._version = version
+                data = self._data
+        return data
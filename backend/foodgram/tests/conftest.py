@@ -0,0 +1,103 @@
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from api.cache import recipe_responses
+from recipe.models import Ingredient, IngredientRecipe, Recipe, Tag
+
+User = get_user_model()
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(
+    django_db_modify_db_settings_parallel_suffix, tmp_path_factory
+):
+    # SQLite в памяти отвечает параллельным потокам "table is locked",
+    # файловая база заставляет их ждать блокировку, как сервер.
+    database = settings.DATABASES["default"]
+    if database["ENGINE"] == "django.db.backends.sqlite3":
+        test = database.setdefault("TEST", {})
+        if not test.get("NAME"):
+            test["NAME"] = str(tmp_path_factory.mktemp("db") / "test.sqlite3")
+
+
+@pytest.fixture(autouse=True)
+def local_cache(settings):
+    # Тесты идут в одном процессе, memcached для них не нужен.
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_caches(local_cache):
+    cache.clear()
+    token_cache.clear()
+    recipe_responses.clear()
+    yield
+    cache.clear()
+    recipe_responses.clear()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create(email="user@example.com", username="user")
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create(email="author@example.com", username="author")
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=name, color="#000000", slug=name)
+        for name in ("breakfast", "lunch", "dinner")
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(
+            name=f"ingredient {i}", measurement_unit="г", amount=1
+        )
+        for i in range(6)
+    ]
+
+
+@pytest.fixture
+def make_recipe(author, tags, ingredients):
+    def make_recipe(name="recipe", items=None, recipe_tags=None, **fields):
+        recipe = Recipe.objects.create(
+            author=fields.pop("author", author),
+            name=name,
+            text=fields.pop("text", name),
+            image=fields.pop("image", "recipes/images/test.png"),
+            cooking_time=fields.pop("cooking_time", 10),
+            **fields,
+        )
+        recipe.tags.set(tags[:2] if recipe_tags is None else recipe_tags)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=i + 1)
+            for i, ingredient in enumerate(ingredients[:3] if items is None else items)
+        )
+        return recipe
+
+    return make_recipe
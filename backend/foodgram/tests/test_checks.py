@@ -0,0 +1,15 @@
+from recipe.checks import check_shared_cache
+
+
+def test_local_cache_is_reported():
+    assert [error.id for error in check_shared_cache(None)] == ["recipe.W001"]
+
+
+def test_shared_cache_passes(settings):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+            "LOCATION": "127.0.0.1:11211",
+        }
+    }
+    assert check_shared_cache(None) == []
@@ -0,0 +1,101 @@
+import random
+import threading
+from collections import Counter
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from recipe.models import Favorite, Follow, Recipe, ShoppingCart
+
+User = get_user_model()
+
+THREADS = 8
+REQUESTS = 25
+
+
+@pytest.fixture
+def setup(transactional_db):
+    author = User.objects.create(email="author@example.com", username="author")
+    recipe = Recipe.objects.create(
+        author=author,
+        name="stress",
+        text="stress",
+        image="recipes/images/stress.png",
+        cooking_time=1,
+    )
+    members = [
+        User.objects.create(email=f"member{i}@example.com", username=f"member{i}")
+        for i in range(2)
+    ]
+    return author, recipe, members
+
+
+def toggle_concurrently(author, recipe, members):
+    urls = (
+        f"/api/recipes/{recipe.pk}/favorite/",
+        f"/api/recipes/{recipe.pk}/shopping_cart/",
+        f"/api/users/{author.pk}/subscribe/",
+    )
+    statuses = Counter()
+    errors = []
+    lock = threading.Lock()
+    # Все потоки стартуют одновременно, чтобы запросы пересекались.
+    barrier = threading.Barrier(THREADS)
+
+    def worker(number):
+        rng = random.Random(number)
+        client = APIClient()
+        try:
+            barrier.wait()
+            for _ in range(REQUESTS):
+                client.force_authenticate(rng.choice(members))
+                method = rng.choice((client.post, client.delete))
+                try:
+                    code = method(rng.choice(urls)).status_code
+                except Exception as error:
+                    # Тестовый клиент пробрасывает исключения из view,
+                    # сервер ответил бы на них 500.
+                    code = 500
+                    errors.append(repr(error))
+                with lock:
+                    statuses[code] += 1
+        finally:
+            # У каждого потока свое соединение с базой.
+            connection.close()
+
+    workers = [
+        threading.Thread(target=worker, args=(number,)) for number in range(THREADS)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return statuses, errors
+
+
+def test_parallel_toggles_keep_data_consistent(setup):
+    author, recipe, members = setup
+    statuses, errors = toggle_concurrently(author, recipe, members)
+    assert sum(statuses.values()) == THREADS * REQUESTS
+    assert statuses[201] and statuses[204]
+    assert not [code for code in statuses if code >= 500], errors[:3]
+    for model, lookup in (
+        (Favorite, {"recipe": recipe}),
+        (ShoppingCart, {"recipe": recipe}),
+        (Follow, {"author": author}),
+    ):
+        duplicates = (
+            model.objects.filter(**lookup)
+            .values("user")
+            .annotate(total=Count("pk"))
+            .filter(total__gt=1)
+        )
+        assert not duplicates.exists(), model.__name__
+    recipe.refresh_from_db()
+    author.refresh_from_db()
+    assert recipe.favorites_count == recipe.favorite.count()
+    assert recipe.in_carts_count == recipe.shopping_cart.count()
+    assert author.followers_count == author.following.count()
@@ -0,0 +1,85 @@
+import os
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from recipe.images import (
+    derivative_names,
+    image_storage,
+    make_derivatives,
+    release_image,
+)
+from recipe.models import Recipe, StoredImage
+
+DIRECTORY = "media/recipes/images"
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+def upload(color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", (1600, 1200), color).save(buffer, "PNG")
+    content = ContentFile(buffer.getvalue())
+    return image_storage().save(f"{DIRECTORY}/photo.png", content)
+
+
+def saved(media):
+    folder = media / DIRECTORY / "derivatives"
+    return {f"{DIRECTORY}/derivatives/{path.name}" for path in folder.iterdir()}
+
+
+def expected(name):
+    return {
+        derivative
+        for names in derivative_names(name).values()
+        for derivative in names.values()
+    }
+
+
+def test_derivatives_keep_predictable_names(db, media):
+    name = upload()
+    assert make_derivatives(name) == 4
+    assert saved(media) == expected(name)
+    assert make_derivatives(name) == 0
+
+
+def test_same_bytes_share_one_file(db, media):
+    assert upload() == upload()
+    assert upload() != upload("blue")
+
+
+def test_release_removes_original_and_derivatives(db, media):
+    name = upload()
+    make_derivatives(name)
+    assert release_image(name)
+    assert not os.path.exists(media / name)
+    assert saved(media) == set()
+
+
+def test_release_keeps_referenced_image(db, media, make_recipe):
+    name = upload()
+    make_derivatives(name)
+    make_recipe("Борщ", image=name)
+    assert Recipe.objects.filter(image=name).exists()
+    assert not release_image(name)
+    assert os.path.exists(media / name)
+    assert saved(media) == expected(name)
+
+
+def test_release_deletes_lock_row(db, media, make_recipe):
+    name = upload()
+    assert StoredImage.objects.filter(name=name).exists()
+    recipe = make_recipe("Борщ", image=name)
+    assert not release_image(name)
+    assert StoredImage.objects.filter(name=name).exists()
+    recipe.delete()
+    assert release_image(name)
+    assert not StoredImage.objects.filter(name=name).exists()
+    assert upload() == name
+    assert os.path.exists(media / name)
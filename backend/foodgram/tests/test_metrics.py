@@ -0,0 +1,50 @@
+from api.metrics import PHASES, Registry
+
+
+def observe(registry, route, seconds=0.01, queries=2):
+    registry.observe(route, {name: seconds for name in PHASES}, queries)
+
+
+def test_render_includes_other_workers():
+    first, second = Registry(worker="web:1"), Registry(worker="web:2")
+    observe(first, "recipes-list")
+    observe(first, "recipes-list")
+    observe(second, "tags-list")
+    for registry in (first, second):
+        text = registry.render()
+        assert (
+            'foodgram_request_queries_count{worker="web:1",route="recipes-list"} 2'
+            in text
+        )
+        assert (
+            'foodgram_request_queries_count{worker="web:2",route="tags-list"} 1'
+            in text
+        )
+
+
+def test_own_counters_are_fresh():
+    first, second = Registry(worker="web:1"), Registry(worker="web:2")
+    observe(second, "tags-list")
+    observe(first, "recipes-list")
+    observe(first, "recipes-list")
+    # Второй снимок первого воркера еще не опубликован, но свой воркер
+    # отдает текущие значения.
+    assert 'worker="web:1",route="recipes-list"} 2' in first.render()
+
+
+def test_extra_is_labeled_with_worker():
+    text = Registry(worker="web:1").render(
+        (("foodgram_token_cache_entries", "gauge", 3),)
+    )
+    assert 'foodgram_token_cache_entries{worker="web:1"} 3' in text
+
+
+def test_metrics_endpoint(client, db, django_user_model):
+    admin = django_user_model.objects.create(
+        email="admin@example.com", username="admin", is_staff=True
+    )
+    client.force_authenticate(admin)
+    client.get("/api/tags/")
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert b'route="tags-list"' in response.content
@@ -0,0 +1,36 @@
+import pytest
+
+from recipe.pantry import pantry_index
+
+
+@pytest.fixture
+def recipes(make_recipe, ingredients):
+    return [
+        make_recipe("soup", items=ingredients[:2]),
+        make_recipe("salad", items=ingredients[1:4]),
+    ]
+
+
+def test_match_orders_by_missing(recipes, ingredients):
+    found = pantry_index.match([ingredients[0].pk, ingredients[1].pk])
+    assert found == [(recipes[0].pk, 2, 0), (recipes[1].pk, 1, 2)]
+
+
+def test_catches_up_with_changed_recipes(recipes, ingredients):
+    pantry_index.match([ingredients[0].pk])
+    recipes[1].ingredient_recipe.all().delete()
+    pantry_index.invalidate([recipes[1].pk])
+    assert pantry_index.match([ingredients[1].pk]) == [(recipes[0].pk, 1, 1)]
+
+
+def test_endpoint(client, recipes, ingredients):
+    response = client.get("/api/recipes/pantry/", {"ingredients": ingredients[0].pk})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "value", ["99999999999999999999", "0", "-1", "abc", str(2 ** 63)]
+)
+def test_endpoint_rejects_bad_ids(client, db, value):
+    response = client.get("/api/recipes/pantry/", {"ingredients": value})
+    assert response.status_code == 400
@@ -0,0 +1,128 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import invalidate_tags
+from recipe import feed, similar
+from recipe.models import Favorite, Follow, Ingredient, ShoppingCart
+from recipe.shopping import get_shopping_list
+
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\S+)(.*)$")
+POSTGRES_SCAN = re.compile(r"Seq Scan on (\S+)")
+# Справочник тэгов читается целиком один раз и дальше берется из кэша.
+ALLOWED_TABLES = {"recipe_tag"}
+
+CASES = {
+    # В SQLite LIKE с ESCAPE, который строит Django, не использует индекс;
+    # поиск в api идет через recipe.search.
+    "ingredient name prefix": (
+        lambda data: list(Ingredient.objects.filter(name__startswith="ingr")),
+        ("postgresql",),
+    ),
+    "recipes by author, newest first": (
+        lambda data: data.client.get(
+            "/api/recipes/", {"author": data.author.pk, "limit": 5}
+        ),
+        None,
+    ),
+    "recipes by tags": (
+        lambda data: data.client.get(
+            "/api/recipes/",
+            {"tags__slug": data.tag.slug, "tags_mode": "all", "limit": 5},
+        ),
+        None,
+    ),
+    "favorites and cart by user": (
+        lambda data: data.client.get(f"/api/recipes/{data.recipe.pk}/"),
+        None,
+    ),
+    "shopping list by user": (
+        lambda data: list(get_shopping_list(data.user)),
+        None,
+    ),
+    "subscription feed": (
+        lambda data: data.client.get("/api/recipes/feed/", {"limit": 5}),
+        None,
+    ),
+    "subscriptions": (
+        lambda data: data.client.get(
+            "/api/users/subscriptions/", {"recipes_limit": 3}
+        ),
+        None,
+    ),
+    "similar recipes": (
+        lambda data: data.client.get(f"/api/recipes/{data.recipe.pk}/similar/"),
+        None,
+    ),
+    "followers by author": (
+        lambda data: feed.push(data.recipe.pk, data.author.pk),
+        None,
+    ),
+}
+
+
+@pytest.fixture
+def data(user, author, user_client, tags, make_recipe):
+    # Тэги могли попасть в кэш до создания тестовых: без сброса фильтр
+    # по слагу не найдет тэг и вернет пустой ответ без запросов.
+    invalidate_tags()
+    recipe = make_recipe("plans")
+    make_recipe("other", recipe_tags=tags[1:])
+    similar.update([recipe.pk])
+    Follow.objects.create(user=user, author=author)
+    Favorite.objects.create(user=user, recipe=recipe)
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    yield SimpleNamespace(
+        user=user, author=author, client=user_client, tag=tags[0], recipe=recipe
+    )
+    invalidate_tags()
+
+
+def full_scans(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            for detail in [row[-1] for row in cursor.fetchall()]:
+                match = SQLITE_SCAN.match(detail)
+                # SCAN subquery - проход по уже выбранным строкам подзапроса,
+                # а не по таблице.
+                if (
+                    match
+                    and "USING" not in match.group(2)
+                    and match.group(1) != "subquery"
+                    and match.group(1) not in ALLOWED_TABLES
+                ):
+                    yield detail
+        else:
+            cursor.execute("EXPLAIN " + sql)
+            for (line,) in cursor.fetchall():
+                match = POSTGRES_SCAN.search(line)
+                if match and match.group(1) not in ALLOWED_TABLES:
+                    yield line.strip()
+
+
+@pytest.mark.parametrize("label", CASES)
+def test_hot_queries_use_indexes(label, data):
+    run, vendors = CASES[label]
+    if vendors and connection.vendor not in vendors:
+        pytest.skip(f"только для {', '.join(vendors)}")
+    if connection.vendor == "postgresql":
+        # На маленьких таблицах планировщик выбирает Seq Scan и при наличии
+        # индекса; без него остается только индекс.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    with CaptureQueriesContext(connection) as queries:
+        result = run(data)
+    assert getattr(result, "status_code", 200) == 200
+    selects = [
+        query["sql"]
+        for query in queries.captured_queries
+        if query["sql"].lstrip().upper().startswith("SELECT")
+    ]
+    # Пустой ответ без запросов ничего не проверяет.
+    assert selects
+    scans = [f"{scan}\n    {sql}" for sql in selects for scan in full_scans(sql)]
+    assert not scans, "\n".join(scans)
@@ -0,0 +1,31 @@
+import pytest
+
+from api import filters
+
+
+@pytest.fixture
+def recipes(make_recipe):
+    return [make_recipe(f"recipe {i}") for i in range(4)]
+
+
+def names(response):
+    return [recipe["name"] for recipe in response.json()["results"]]
+
+
+def test_cursor_mode_orders_by_newest(client, recipes):
+    response = client.get("/api/recipes/", {"pagination": "cursor", "limit": 10})
+    assert response.status_code == 200
+    assert "count" not in response.json()
+    assert names(response) == [recipe.name for recipe in reversed(recipes)]
+
+
+@pytest.mark.parametrize("params", [{"pagination": "cursor"}, {"cursor": "abc"}])
+def test_search_keeps_relevance_order(client, recipes, monkeypatch, params):
+    relevant = [recipes[1], recipes[3], recipes[0]]
+    monkeypatch.setattr(
+        filters, "search", lambda query, limit: [recipe.pk for recipe in relevant]
+    )
+    response = client.get("/api/recipes/", {"search": "borscht", **params})
+    assert response.status_code == 200
+    assert response.json()["count"] == 3
+    assert names(response) == [recipe.name for recipe in relevant]
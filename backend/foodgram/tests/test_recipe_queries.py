@@ -0,0 +1,42 @@
+import pytest
+
+
+@pytest.fixture
+def recipes(make_recipe):
+    return [make_recipe(name=f"recipe {i}") for i in range(25)]
+
+
+@pytest.mark.parametrize("limit", (1, 5, 20))
+def test_recipe_list_queries_anonymous(
+    client, recipes, django_assert_num_queries, limit
+):
+    with django_assert_num_queries(5):
+        response = client.get("/api/recipes/", {"limit": limit})
+    assert response.status_code == 200
+    assert len(response.data["results"]) == limit
+
+
+@pytest.mark.parametrize("limit", (1, 5, 20))
+def test_recipe_list_queries_authenticated(
+    user_client, recipes, django_assert_num_queries, limit
+):
+    with django_assert_num_queries(6):
+        response = user_client.get("/api/recipes/", {"limit": limit})
+    assert response.status_code == 200
+    assert len(response.data["results"]) == limit
+
+
+def test_recipe_retrieve_queries_anonymous(client, recipes, django_assert_num_queries):
+    with django_assert_num_queries(4):
+        response = client.get(f"/api/recipes/{recipes[0].pk}/")
+    assert response.status_code == 200
+    assert len(response.data["ingredients"]) == 3
+
+
+def test_recipe_retrieve_queries_authenticated(
+    user_client, recipes, django_assert_num_queries
+):
+    with django_assert_num_queries(5):
+        response = user_client.get(f"/api/recipes/{recipes[0].pk}/")
+    assert response.status_code == 200
+    assert response.data["is_favorited"] is False
@@ -0,0 +1,24 @@
+from recipe.fulltext import search
+
+
+def test_renamed_ingredient_is_reindexed(transactional_db, make_recipe, ingredients):
+    # Без обертки в транзакцию on_commit выполняется сразу, как в проде.
+    recipe = make_recipe("soup", items=ingredients[:2])
+    make_recipe("salad", items=ingredients[2:4])
+    assert search("чечевица", 10) == []
+    ingredient = ingredients[0]
+    ingredient.name = "чечевица"
+    ingredient.save()
+    assert search("чечевица", 10) == [recipe.pk]
+
+
+def test_unchanged_ingredient_is_not_reindexed(
+    transactional_db, make_recipe, ingredients, monkeypatch
+):
+    make_recipe("soup", items=ingredients[:2])
+    calls = []
+    monkeypatch.setattr("recipe.signals.reindex_ingredient", calls.append)
+    ingredient = ingredients[0]
+    ingredient.measurement_unit = "кг"
+    ingredient.save()
+    assert calls == []
@@ -0,0 +1,112 @@
+import os
+import time
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.shopping_list import (
+    CLAIM_TIMEOUT,
+    MAX_ATTEMPTS,
+    RETENTION,
+    claim_job,
+    cleanup,
+    get_path,
+    process_job,
+)
+from recipe.models import ShoppingListJob
+
+
+@pytest.fixture
+def lists(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    settings.SHOPPING_LISTS_ROOT = str(tmp_path / "lists")
+    return tmp_path / "lists"
+
+
+def make_stale(job, attempts=1):
+    ShoppingListJob.objects.filter(pk=job.pk).update(
+        claimed=timezone.now() - CLAIM_TIMEOUT * 2, attempts=attempts
+    )
+
+
+def test_claim_marks_job(user):
+    job = ShoppingListJob.objects.create(user=user)
+    claimed = claim_job()
+    assert claimed.pk == job.pk
+    assert claimed.status == ShoppingListJob.RUNNING
+    assert claimed.claimed is not None
+    assert claimed.attempts == 1
+    assert claim_job() is None
+
+
+def test_stale_job_is_requeued(user):
+    job = ShoppingListJob.objects.create(user=user)
+    claim_job()
+    make_stale(job)
+    claimed = claim_job()
+    assert claimed.pk == job.pk
+    assert claimed.attempts == 2
+
+
+def test_job_fails_after_max_attempts(user):
+    job = ShoppingListJob.objects.create(user=user)
+    claim_job()
+    make_stale(job, attempts=MAX_ATTEMPTS)
+    assert claim_job() is None
+    job.refresh_from_db()
+    assert job.status == ShoppingListJob.FAILED
+    assert job.finished is not None
+
+
+def test_requeued_job_result_belongs_to_new_claim(user, lists):
+    job = ShoppingListJob.objects.create(user=user)
+    first = claim_job()
+    make_stale(job)
+    second = claim_job()
+    process_job(first)
+    job.refresh_from_db()
+    assert job.status == ShoppingListJob.RUNNING
+    process_job(second)
+    job.refresh_from_db()
+    assert job.status == ShoppingListJob.DONE
+
+
+def test_pdf_is_private(user, author, user_client, lists, settings):
+    job = ShoppingListJob.objects.create(user=user)
+    process_job(claim_job())
+    job.refresh_from_db()
+    path = get_path(job.digest)
+    assert os.path.dirname(path) == str(lists)
+    assert not path.startswith(settings.MEDIA_ROOT)
+    url = f"/api/recipes/shopping_cart_jobs/{job.pk}/download/"
+    assert user_client.get(url).status_code == 200
+    assert APIClient().get(url).status_code == 401
+    other = APIClient()
+    other.force_authenticate(author)
+    assert other.get(url).status_code == 404
+
+
+def test_cleanup_removes_old_files_and_jobs(user, lists, tmp_path):
+    lists.mkdir()
+    legacy = tmp_path / "media" / "shopping_lists"
+    legacy.mkdir(parents=True)
+    (legacy / "public.pdf").write_bytes(b"%PDF")
+    old, fresh = lists / "old.pdf", lists / "fresh.pdf"
+    old.write_bytes(b"%PDF")
+    fresh.write_bytes(b"%PDF")
+    past = time.time() - RETENTION.total_seconds() - 60
+    os.utime(old, (past, past))
+    ShoppingListJob.objects.create(
+        user=user,
+        status=ShoppingListJob.DONE,
+        finished=timezone.now() - RETENTION * 2,
+    )
+    kept = ShoppingListJob.objects.create(
+        user=user, status=ShoppingListJob.DONE, finished=timezone.now()
+    )
+    assert cleanup() == (2, 1)
+    assert not (legacy / "public.pdf").exists()
+    assert not old.exists()
+    assert fresh.exists()
+    assert list(ShoppingListJob.objects.values_list("pk", flat=True)) == [kept.pk]
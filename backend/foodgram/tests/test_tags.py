@@ -0,0 +1,70 @@
+import time
+
+import pytest
+from django.core.cache import cache
+
+from api.cache import TAGS_KEY
+
+
+@pytest.fixture
+def warm_client(client, tags):
+    response = client.get("/api/tags/")
+    assert response.status_code == 200
+    return client
+
+
+def test_tags_warm_hit_without_queries(warm_client, tags, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        response = warm_client.get("/api/tags/")
+    assert response.status_code == 200
+    assert [tag["slug"] for tag in response.data] == [tag.slug for tag in tags]
+    assert response["ETag"]
+
+
+def test_tag_detail_from_cache(warm_client, tags, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        response = warm_client.get(f"/api/tags/{tags[1].pk}/")
+    assert response.status_code == 200
+    assert response.data["slug"] == tags[1].slug
+
+
+def test_tags_not_modified(warm_client, django_assert_num_queries):
+    etag = warm_client.get("/api/tags/")["ETag"]
+    with django_assert_num_queries(0):
+        response = warm_client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    assert not response.content
+
+
+def test_tags_changed_etag(warm_client):
+    response = warm_client.get("/api/tags/", HTTP_IF_NONE_MATCH='"outdated"')
+    assert response.status_code == 200
+
+
+def test_tags_entry_expires(warm_client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(cache, "set", lambda *args: calls.append(args))
+    cache.delete(TAGS_KEY)
+    warm_client.get("/api/tags/")
+    assert calls and calls[0][0] == TAGS_KEY
+    assert calls[0][2] is not None
+
+
+def test_last_modified_survives_rebuild(warm_client, tags, monkeypatch):
+    first = warm_client.get("/api/tags/")
+    later = time.time() + 3600
+    monkeypatch.setattr(time, "time", lambda: later)
+    cache.delete(TAGS_KEY)
+    rebuilt = warm_client.get("/api/tags/")
+    assert rebuilt["Last-Modified"] == first["Last-Modified"]
+    response = warm_client.get(
+        "/api/tags/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+    )
+    assert response.status_code == 304
+    tags[0].name = "renamed"
+    tags[0].save()
+    cache.delete(TAGS_KEY)
+    changed = warm_client.get("/api/tags/")
+    assert changed["ETag"] != first["ETag"]
+    assert changed["Last-Modified"] != first["Last-Modified"]
@@ -0,0 +1,52 @@
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import (
+    CachedTokenAuthentication,
+    TokenCache,
+    token_cache,
+)
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+def test_cached_token_skips_database(token, django_assert_num_queries):
+    auth = CachedTokenAuthentication()
+    auth.authenticate_credentials(token.key)
+    with django_assert_num_queries(0):
+        user, _ = auth.authenticate_credentials(token.key)
+    assert user.pk == token.user_id
+
+
+def test_eviction_reaches_other_processes(token):
+    # Кэш другого воркера: своя память процесса, общий кэш Django.
+    other = TokenCache(size=16, ttl=30, shared=True)
+    value = CachedTokenAuthentication().authenticate_credentials(token.key)
+    other.set(token.key, value, other.version())
+    assert other.get(token.key, other.version()) is not None
+    token_cache.delete(token.key)
+    assert other.get(token.key, other.version()) is None
+
+
+def test_deleted_token_is_rejected(token):
+    auth = CachedTokenAuthentication()
+    auth.authenticate_credentials(token.key)
+    key = token.key
+    token.delete()
+    token_cache.delete(key)
+    with pytest.raises(AuthenticationFailed):
+        auth.authenticate_credentials(key)
+
+
+def test_stale_load_is_not_reused(token):
+    other = TokenCache(size=16, ttl=30, shared=True)
+    version = other.version()
+    value = CachedTokenAuthentication().authenticate_credentials(token.key)
+    # Токен сброшен, пока пользователь загружался из базы.
+    token_cache.delete(token.key)
+    other.set(token.key, value, version)
+    assert other.get(token.key, other.version()) is None
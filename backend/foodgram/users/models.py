@@ -14,6 +14,12 @@ class User(AbstractUser):
     password = models.CharField(max_length=150)
     first_name = models.CharField(max_length=150)
     last_name = models.CharField(max_length=150)
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Число рецептов"
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Число подписчиков"
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]